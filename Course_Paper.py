@@ -1,6 +1,27 @@
+import sys
+import json
+import math
+import platform
 import time
-from typing import List, Tuple, Optional, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import random
+import csv
+import itertools
+import mmap
+import struct
+import argparse
+import asyncio
+import tracemalloc
+import queue
+import sqlite3
+import multiprocessing
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from typing import List, Tuple, Optional, Set, Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Ввод судоку 
 SUDOKU_INPUT = """
@@ -15,12 +36,24 @@ SUDOKU_INPUT = """
 004010003
 """
 
+""" Символы значений клеток: индекс символа - значение (после 9 идут буквы для полей 16x16 и 25x25) """
+CELL_SYMBOLS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+""" Значение клетки по символу, пустая клетка - '0' или '.' """
+def parse_cell_symbol(char: str) -> int:
+    if char == '.':
+        return 0
+    value = CELL_SYMBOLS.find(char.upper())
+    if value < 0:
+        raise ValueError(f"недопустимый символ {char!r}")
+    return value
+
 """ Преобразование строк в числовую матрицу """
 def parse_sudoku(input_str: str) -> List[List[int]]:
     lines = input_str.strip().split('\n')
     puzzle = []  
     for line in lines:
-        row = [int(char) if char != '0' else 0 for char in line.strip()]
+        row = [parse_cell_symbol(char) for char in line.strip()]
         puzzle.append(row)  
     return puzzle
 
@@ -29,70 +62,371 @@ ORIGINAL_PUZZLE = parse_sudoku(SUDOKU_INPUT)
 
 
 
+# Геометрия поля
+""" Размеры и таблицы соседства поля N^2 x N^2 (box - сторона блока, клетки нумеруются 0..side^2-1) """
+class SudokuGeometry:
+
+    def __init__(self, box: int):
+        side = box * box
+        self.box = box
+        self.side = side
+        self.cells = side * side
+        self.full_mask = (1 << side) - 1
+        self.dlx_columns = 4 * self.cells
+        self.row_of = [i // side for i in range(self.cells)]
+        self.col_of = [i % side for i in range(self.cells)]
+        self.box_of = [(i // side // box) * box + (i % side) // box for i in range(self.cells)]
+        self.row_units = [[r * side + c for c in range(side)] for r in range(side)]
+        self.col_units = [[r * side + c for r in range(side)] for c in range(side)]
+        self.box_units = [[i for i in range(self.cells) if self.box_of[i] == b] for b in range(side)]
+        self.all_units = self.row_units + self.col_units + self.box_units
+        self.peers = [
+            sorted(set(self.row_units[self.row_of[i]] + self.col_units[self.col_of[i]]
+                       + self.box_units[self.box_of[i]]) - {i})
+            for i in range(self.cells)
+        ]
+        self.box_line_intersections = self._build_box_line_intersections()
+
+    """ Столбцы точного покрытия для строки (клетка, число): клетка, число в строке, в столбце, в блоке """
+    def dlx_constraints(self, row: int, col: int, num: int) -> List[int]:
+        side, cells = self.side, self.cells
+        block = (row // self.box) * self.box + col // self.box
+        return [row * side + col, cells + row * side + (num - 1),
+                2 * cells + col * side + (num - 1), 3 * cells + block * side + (num - 1)]
+
+    """ Пересечения блок/линия: (пересечение, остаток блока, остаток линии) """
+    def _build_box_line_intersections(self) -> List[Tuple[List[int], List[int], List[int]]]:
+        intersections = []
+        for box in self.box_units:
+            for line in self.row_units + self.col_units:
+                inter = [i for i in box if i in line]
+                if inter:
+                    intersections.append((
+                        inter,
+                        [i for i in box if i not in inter],
+                        [i for i in line if i not in inter],
+                    ))
+        return intersections
+
+""" Геометрии уже встречавшихся размеров """
+_GEOMETRIES = {}
+
+""" Геометрия поля со стороной side (4, 9, 16, 25, ...) """
+def get_geometry(side: int) -> SudokuGeometry:
+    geometry = _GEOMETRIES.get(side)
+    if geometry is None:
+        box = math.isqrt(side)
+        if side < 1 or box * box != side:
+            raise ValueError(f"сторона поля {side} не является квадратом целого числа")
+        geometry = _GEOMETRIES[side] = SudokuGeometry(box)
+    return geometry
+
+
+
+# Управление решением
+""" Через сколько узлов поиска проверяются флаги управления """
+CHECK_INTERVAL = 64
+
+""" Итог решения в поле 'status' словаря результата """
+STATUS_SOLVED = 'solved'
+STATUS_UNSOLVABLE = 'unsolvable'
+STATUS_TIMED_OUT = 'timed_out'
+STATUS_CANCELLED = 'cancelled'
+
+""" Решение прервано извне """
+class SolveCancelled(Exception):
+    status = STATUS_CANCELLED
+
+""" Исчерпан бюджет времени или узлов """
+class SolveTimedOut(SolveCancelled):
+    status = STATUS_TIMED_OUT
+
+""" Кооперативное управление: отмена, лимит времени (с), лимит узлов и периодический отчет о ходе решения.
+    Циклы поиска вызывают check() раз в CHECK_INTERVAL узлов (с этой точностью соблюдается и лимит узлов);
+    progress(stats, elapsed) вызывается
+    не чаще раза в progress_interval секунд """
+class SolveControl:
+
+    def __init__(self, cancel_event=None, time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                 progress=None, progress_interval: float = 0.5):
+        self.cancel_event = cancel_event
+        self.max_iterations = max_iterations
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.start_time = time.perf_counter()
+        self.deadline = self.start_time + time_limit if time_limit is not None else None
+        self.next_report = self.start_time + progress_interval
+
+    """ Проверка флагов: при отмене - SolveCancelled, при исчерпании бюджета - SolveTimedOut """
+    def check(self, stats: dict):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SolveCancelled()
+        if self.max_iterations is not None and stats['iterations'] >= self.max_iterations:
+            raise SolveTimedOut()
+        if self.deadline is None and self.progress is None:
+            return
+        now = time.perf_counter()
+        if self.deadline is not None and now >= self.deadline:
+            raise SolveTimedOut()
+        if self.progress is not None and now >= self.next_report:
+            self.next_report = now + self.progress_interval
+            self.progress(dict(stats), now - self.start_time)
+
+""" Управление из параметров run_*: переданное явно или новое по лимитам, None - без ограничений """
+def make_solve_control(control: Optional[SolveControl] = None, time_limit: Optional[float] = None,
+                       max_iterations: Optional[int] = None, progress=None) -> Optional[SolveControl]:
+    if control is not None:
+        return control
+    if time_limit is None and max_iterations is None and progress is None:
+        return None
+    return SolveControl(time_limit=time_limit, max_iterations=max_iterations, progress=progress)
+
+""" Вызов решателя с перехватом остановки: (решено, статус) """
+def guarded_solve(solve) -> Tuple[bool, str]:
+    try:
+        solved = solve()
+    except SolveCancelled as stop:
+        return False, stop.status
+    return solved, STATUS_SOLVED if solved else STATUS_UNSOLVABLE
+
+
+
+# Инструментирование
+""" Необязательный сборщик телеметрии поиска. Решатели вызывают его только если он передан,
+    поэтому выключенный стоит одну проверку на None в узле. sampler(snapshot) вызывается
+    каждые sample_interval узлов """
+class SolverProbe:
+
+    def __init__(self, sampler=None, sample_interval: int = 1000):
+        self.sampler = sampler
+        self.sample_interval = sample_interval
+        self.nodes = 0
+        self.depth_nodes = []
+        self.covers = 0
+        self.uncovers = 0
+        self.branch_sizes = {}
+        self.candidate_time = 0.0
+        self.elapsed = 0.0
+        self.started_at = None
+
+    """ Начало замера времени решения """
+    def begin(self):
+        self.started_at = time.perf_counter()
+
+    """ Конец замера времени решения """
+    def end(self):
+        if self.started_at is not None:
+            self.elapsed += time.perf_counter() - self.started_at
+            self.started_at = None
+
+    """ Узел поиска на глубине depth """
+    def on_node(self, depth: int):
+        self.nodes += 1
+        depth_nodes = self.depth_nodes
+        if depth >= len(depth_nodes):
+            depth_nodes.extend([0] * (depth + 1 - len(depth_nodes)))
+        depth_nodes[depth] += 1
+        if self.sampler is not None and self.nodes % self.sample_interval == 0:
+            self.sampler(self.snapshot())
+
+    """ Точка ветвления: размер выбранного столбца или число кандидатов клетки """
+    def on_branch(self, size: int):
+        self.branch_sizes[size] = self.branch_sizes.get(size, 0) + 1
+
+    """ Текущее состояние счетчиков """
+    def snapshot(self) -> dict:
+        elapsed = self.elapsed
+        if self.started_at is not None:
+            elapsed += time.perf_counter() - self.started_at
+        return {
+            'nodes': self.nodes,
+            'depth_nodes': list(self.depth_nodes),
+            'covers': self.covers,
+            'uncovers': self.uncovers,
+            'branch_sizes': dict(sorted(self.branch_sizes.items())),
+            'candidate_time': self.candidate_time,
+            'search_time': max(0.0, elapsed - self.candidate_time),
+        }
+
+
+
 # Наивный перебор
-""" Проверка, можно ли вставить число в клетку"""
-def is_valid_move(board: List[List[int]], row: int, col: int, num: int) -> bool:
+""" Проверка, можно ли вставить число в клетку (box - сторона блока, по умолчанию из размера поля)"""
+def is_valid_move(board: List[List[int]], row: int, col: int, num: int, box: Optional[int] = None) -> bool:
+    side = len(board)
+    if box is None:
+        box = math.isqrt(side)
      
-    for j in range(9):
+    for j in range(side):
         if board[row][j] == num:
             return False  
      
-    for i in range(9):
+    for i in range(side):
         if board[i][col] == num:
             return False  
     
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3) 
-    for i in range(start_row, start_row + 3):
-        for j in range(start_col, start_col + 3):
+    start_row, start_col = box * (row // box), box * (col // box) 
+    for i in range(start_row, start_row + box):
+        for j in range(start_col, start_col + box):
             if board[i][j] == num:
                 return False  
     return True  
 
 """ Находим первую пустую клетку """
 def find_empty_cell(board: List[List[int]]) -> Optional[Tuple[int, int]]:
-    for i in range(9):  
-        for j in range(9):  
+    for i in range(len(board)):  
+        for j in range(len(board)):  
             if board[i][j] == 0:  
                 return (i, j)  
     return None  
 
 """ Сам алгоритм наивного перебора """
-def naive_backtrack_solve(board: List[List[int]], stats: dict) -> bool:
+def naive_backtrack_solve(board: List[List[int]], stats: dict, control: Optional[SolveControl] = None,
+                          probe: Optional[SolverProbe] = None, depth: int = 0) -> bool:
     stats['iterations'] += 1  
+    if control is not None and stats['iterations'] % CHECK_INTERVAL == 0:
+        control.check(stats)
+    if probe is not None:
+        probe.on_node(depth)
     empty = find_empty_cell(board)  
     if not empty:  
         return True  
     row, col = empty  
+    box = math.isqrt(len(board))
     
-    for num in range(1, 10):
-        if is_valid_move(board, row, col, num):  
+    for num in range(1, len(board) + 1):
+        if is_valid_move(board, row, col, num, box):  
             board[row][col] = num  
             
-            if naive_backtrack_solve(board, stats):
+            if naive_backtrack_solve(board, stats, control, probe, depth + 1):
                 return True  
             
             board[row][col] = 0  
             stats['backtracks'] += 1  
     return False  
 
+""" Наивный перебор без повторных поисков: плоское поле, список пустых клеток (на глубине depth
+    заполняется empties[depth] - та же клетка, что нашел бы find_empty_cell) и маски занятых чисел
+    строк/столбцов/блоков вместо is_valid_move. Порядок обхода и счетчики iterations/backtracks
+    совпадают с naive_backtrack_solve """
+def naive_fast_solve(board: List[List[int]], stats: dict, control: Optional[SolveControl] = None,
+                     probe: Optional[SolverProbe] = None) -> bool:
+    side = len(board)
+    geometry = get_geometry(side)
+    flat = [num for row in board for num in row]
+    # бит num - число num занято
+    row_used, col_used, box_used = [0] * side, [0] * side, [0] * side
+    for i, num in enumerate(flat):
+        if num:
+            row_used[geometry.row_of[i]] |= 1 << num
+            col_used[geometry.col_of[i]] |= 1 << num
+            box_used[geometry.box_of[i]] |= 1 << num
+    empties = [i for i, num in enumerate(flat) if num == 0]
+    empty_rows = [geometry.row_of[i] for i in empties]
+    empty_cols = [geometry.col_of[i] for i in empties]
+    empty_boxes = [geometry.box_of[i] for i in empties]
+    placed = [0] * len(empties)
+    full = geometry.full_mask << 1
+    iterations, backtracks = stats['iterations'], stats['backtracks']
+    depth = 0
+    entering = True
+    try:
+        while True:
+            if entering:
+                iterations += 1
+                if control is not None and iterations % CHECK_INTERVAL == 0:
+                    stats['iterations'], stats['backtracks'] = iterations, backtracks
+                    control.check(stats)
+                if probe is not None:
+                    probe.on_node(depth)
+                if depth == len(empties):
+                    for cell, bit in zip(empties, placed):
+                        board[cell // side][cell % side] = bit.bit_length() - 1
+                    return True
+                row, col, box = empty_rows[depth], empty_cols[depth], empty_boxes[depth]
+                free = full & ~(row_used[row] | col_used[col] | box_used[box])
+            else:
+                # возврат из неудачной ветви: снять число и искать следующее большее
+                row, col, box = empty_rows[depth], empty_cols[depth], empty_boxes[depth]
+                bit = placed[depth]
+                row_used[row] ^= bit
+                col_used[col] ^= bit
+                box_used[box] ^= bit
+                backtracks += 1
+                free = full & ~(row_used[row] | col_used[col] | box_used[box]) & -(bit << 1)
+            if free:
+                bit = free & -free
+                placed[depth] = bit
+                row_used[row] |= bit
+                col_used[col] |= bit
+                box_used[box] |= bit
+                depth += 1
+                entering = True
+            elif depth == 0:
+                return False
+            else:
+                depth -= 1
+                entering = False
+    finally:
+        stats['iterations'], stats['backtracks'] = iterations, backtracks
+
 """ Запуск наивного перебора """
-def run_naive_algorithm() -> dict:
-    puzzle = [row[:] for row in ORIGINAL_PUZZLE]  
+def run_naive_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                        time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                        progress=None, probe: Optional[SolverProbe] = None) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]  
     stats = {'iterations': 0, 'backtracks': 0}  
+    control = make_solve_control(control, time_limit, max_iterations, progress)
     start_time = time.perf_counter()  
-    solved = naive_backtrack_solve(puzzle, stats)  
+    if probe is not None:
+        probe.begin()
+    solved, status = guarded_solve(lambda: naive_backtrack_solve(puzzle, stats, control, probe))
+    if probe is not None:
+        probe.end()
     elapsed = time.perf_counter() - start_time  
     
-    return {
+    result = {
         'algorithm': 'Наивный перебор',
         'solved': solved,
+        'status': status,
         'time': elapsed,
         'iterations': stats['iterations'],
         'backtracks': stats['backtracks'],
         'solution': puzzle if solved else None
     }
+    if probe is not None:
+        result['probe'] = probe.snapshot()
+    return result
 
 
+""" Запуск быстрого наивного перебора (те же узлы, что у run_naive_algorithm) """
+def run_naive_fast_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                             time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                             progress=None, probe: Optional[SolverProbe] = None) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]
+    stats = {'iterations': 0, 'backtracks': 0}
+    control = make_solve_control(control, time_limit, max_iterations, progress)
+    start_time = time.perf_counter()
+    if probe is not None:
+        probe.begin()
+    solved, status = guarded_solve(lambda: naive_fast_solve(puzzle, stats, control, probe))
+    if probe is not None:
+        probe.end()
+    elapsed = time.perf_counter() - start_time
+
+    result = {
+        'algorithm': 'Наивный перебор (маски)',
+        'solved': solved,
+        'status': status,
+        'time': elapsed,
+        'iterations': stats['iterations'],
+        'backtracks': stats['backtracks'],
+        'solution': puzzle if solved else None
+    }
+    if probe is not None:
+        result['probe'] = probe.snapshot()
+    return result
+
 
 # Перебор с ограничениями
 """ Возвращает множество возможных чисел(кандидатов) """
@@ -100,19 +434,21 @@ def get_candidates(board: List[List[int]], row: int, col: int) -> Set[int]:
     if board[row][col] != 0:  
         return set()  
     
-    candidates = set(range(1, 10))
+    side = len(board)
+    box = get_geometry(side).box
+    candidates = set(range(1, side + 1))
     
-    for j in range(9):
+    for j in range(side):
         if board[row][j] != 0:
             candidates.discard(board[row][j])
     
-    for i in range(9):
+    for i in range(side):
         if board[i][col] != 0:
             candidates.discard(board[i][col])
     
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(start_row, start_row + 3):
-        for j in range(start_col, start_col + 3):
+    start_row, start_col = box * (row // box), box * (col // box)
+    for i in range(start_row, start_row + box):
+        for j in range(start_col, start_col + box):
             if board[i][j] != 0:
                 candidates.discard(board[i][j])
     return candidates  
@@ -120,9 +456,9 @@ def get_candidates(board: List[List[int]], row: int, col: int) -> Set[int]:
 """ Поиск клетки с минимальным количеством возможных чисел """
 def get_most_constrained_cell(board: List[List[int]]) -> Optional[Tuple[int, int, Set[int]]]:
     best_cell = None  
-    min_candidates = 10  
-    for i in range(9):  
-        for j in range(9):  
+    min_candidates = len(board) + 1  
+    for i in range(len(board)):  
+        for j in range(len(board)):  
             if board[i][j] == 0:  
                 candidates = get_candidates(board, i, j)  
                 if len(candidates) == 0:  
@@ -132,42 +468,637 @@ def get_most_constrained_cell(board: List[List[int]]) -> Optional[Tuple[int, int
                     best_cell = (i, j, candidates)  
     return best_cell  
 
-""" Сам алгоритм перебора с ограничениями """
-def constrained_backtrack_solve(board: List[List[int]], stats: dict) -> bool:
-    stats['iterations'] += 1  
-    cell_info = get_most_constrained_cell(board)  
-    if not cell_info:  
-        for i in range(9):
-            for j in range(9):
+""" Цифры, соответствующие битам маски, по возрастанию """
+def mask_to_digits(mask: int) -> List[int]:
+    digits = []
+    while mask:
+        low = mask & -mask
+        digits.append(low.bit_length())
+        mask ^= low
+    return digits
+
+""" Битовые маски занятых цифр по строкам, столбцам и блокам (бит d-1 - цифра d) """
+class CandidateMasks:
+
+    def __init__(self, board: List[List[int]]):
+        self.board = board
+        self.geometry = get_geometry(len(board))
+        side = self.geometry.side
+        self.full_mask = self.geometry.full_mask
+        self.row_masks = [0] * side
+        self.col_masks = [0] * side
+        self.box_masks = [0] * side
+        self.empty_cells = []
+        for i in range(side):
+            for j in range(side):
+                box = self.geometry.box_of[i * side + j]
                 if board[i][j] == 0:
-                    return False  
-        return True  
-    row, col, candidates = cell_info  
-    
-    for num in candidates:
-        board[row][col] = num  
-        
-        if constrained_backtrack_solve(board, stats):
-            return True  
-        board[row][col] = 0  
-        stats['backtracks'] += 1  
-    return False  
+                    self.empty_cells.append((i, j, box))
+                    continue
+                bit = 1 << (board[i][j] - 1)
+                self.row_masks[i] |= bit
+                self.col_masks[j] |= bit
+                self.box_masks[box] |= bit
+
+    """ Поставить цифру в клетку и обновить маски """
+    def place(self, row: int, col: int, box: int, num: int):
+        bit = 1 << (num - 1)
+        self.board[row][col] = num
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[box] |= bit
+
+    """ Убрать цифру из клетки (обратная операция к place) """
+    def undo(self, row: int, col: int, box: int, num: int):
+        bit = 1 << (num - 1)
+        self.board[row][col] = 0
+        self.row_masks[row] ^= bit
+        self.col_masks[col] ^= bit
+        self.box_masks[box] ^= bit
+
+    """ Маска кандидатов для пустой клетки """
+    def candidates_mask(self, row: int, col: int, box: int) -> int:
+        return self.full_mask & ~(self.row_masks[row] | self.col_masks[col] | self.box_masks[box])
+
+    """ Список кандидатов по возрастанию """
+    def candidates(self, row: int, col: int) -> List[int]:
+        if self.board[row][col] != 0:
+            return []
+        return mask_to_digits(self.candidates_mask(row, col, self.geometry.box_of[row * self.geometry.side + col]))
+
+    """ Клетка с минимумом кандидатов (первая в порядке обхода), None - нет пустых клеток или тупик """
+    def most_constrained_cell(self) -> Optional[Tuple[int, int, int, int]]:
+        board = self.board
+        rows, cols, boxes = self.row_masks, self.col_masks, self.box_masks
+        full = self.full_mask
+        best_cell = None
+        min_candidates = self.geometry.side + 1
+        for row, col, box in self.empty_cells:
+            if board[row][col] != 0:
+                continue
+            mask = full & ~(rows[row] | cols[col] | boxes[box])
+            count = mask.bit_count()
+            if count == 0:
+                return None
+            if count < min_candidates:
+                min_candidates = count
+                best_cell = (row, col, box, mask)
+        return best_cell
+
+    """ Как most_constrained_cell, но среди клеток с минимумом кандидатов выбирает rng """
+    def random_constrained_cell(self, rng: random.Random) -> Optional[Tuple[int, int, int, int]]:
+        board = self.board
+        rows, cols, boxes = self.row_masks, self.col_masks, self.box_masks
+        full = self.full_mask
+        ties = []
+        min_candidates = self.geometry.side + 1
+        for row, col, box in self.empty_cells:
+            if board[row][col] != 0:
+                continue
+            mask = full & ~(rows[row] | cols[col] | boxes[box])
+            count = mask.bit_count()
+            if count == 0:
+                return None
+            if count < min_candidates:
+                min_candidates = count
+                ties = [(row, col, box, mask)]
+            elif count == min_candidates:
+                ties.append((row, col, box, mask))
+        return rng.choice(ties) if ties else None
+
+""" Рекурсивный поиск на масках кандидатов """
+def _constrained_search(masks: CandidateMasks, stats: dict, control: Optional[SolveControl] = None,
+                        probe: Optional[SolverProbe] = None, depth: int = 0) -> bool:
+    stats['iterations'] += 1
+    if control is not None and stats['iterations'] % CHECK_INTERVAL == 0:
+        control.check(stats)
+    if probe is not None:
+        probe.on_node(depth)
+        started_at = time.perf_counter()
+        cell_info = masks.most_constrained_cell()
+        probe.candidate_time += time.perf_counter() - started_at
+    else:
+        cell_info = masks.most_constrained_cell()
+    if not cell_info:
+        for row, col, _ in masks.empty_cells:
+            if masks.board[row][col] == 0:
+                return False
+        return True
+    row, col, box, mask = cell_info
+    if probe is not None:
+        probe.on_branch(mask.bit_count())
+
+    for num in mask_to_digits(mask):
+        masks.place(row, col, box, num)
+
+        if _constrained_search(masks, stats, control, probe, depth + 1):
+            return True
+        masks.undo(row, col, box, num)
+        stats['backtracks'] += 1
+    return False
+
+""" Сам алгоритм перебора с ограничениями """
+def constrained_backtrack_solve(board: List[List[int]], stats: dict, control: Optional[SolveControl] = None,
+                                probe: Optional[SolverProbe] = None) -> bool:
+    return _constrained_search(CandidateMasks(board), stats, control, probe)
+
+""" Рекурсивный генератор решений на масках кандидатов """
+def _constrained_solutions(masks: CandidateMasks, stats: dict,
+                           control: Optional[SolveControl] = None) -> Iterator[List[List[int]]]:
+    stats['iterations'] += 1
+    if control is not None and stats['iterations'] % CHECK_INTERVAL == 0:
+        control.check(stats)
+    cell_info = masks.most_constrained_cell()
+    if not cell_info:
+        if all(masks.board[row][col] for row, col, _ in masks.empty_cells):
+            yield [row[:] for row in masks.board]
+        return
+    row, col, box, mask = cell_info
+    for num in mask_to_digits(mask):
+        masks.place(row, col, box, num)
+        yield from _constrained_solutions(masks, stats, control)
+        masks.undo(row, col, box, num)
+        stats['backtracks'] += 1
+
+""" Ленивый перебор всех решений перебором с ограничениями (доска возвращается в исходное состояние) """
+def iter_constrained_solutions(board: List[List[int]], stats: dict,
+                               control: Optional[SolveControl] = None) -> Iterator[List[List[int]]]:
+    masks = CandidateMasks(board)
+    try:
+        yield from _constrained_solutions(masks, stats, control)
+    finally:
+        for row, col, _ in masks.empty_cells:
+            board[row][col] = 0
 
 """ Запуск алгоритма перебора с ограничениями """
-def run_constrained_algorithm() -> dict:
-    puzzle = [row[:] for row in ORIGINAL_PUZZLE]  
+def run_constrained_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                              time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                              progress=None, probe: Optional[SolverProbe] = None) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]  
     stats = {'iterations': 0, 'backtracks': 0}  
+    control = make_solve_control(control, time_limit, max_iterations, progress)
     start_time = time.perf_counter()  
-    solved = constrained_backtrack_solve(puzzle, stats)  
+    if probe is not None:
+        probe.begin()
+    solved, status = guarded_solve(lambda: constrained_backtrack_solve(puzzle, stats, control, probe))
+    if probe is not None:
+        probe.end()
     elapsed = time.perf_counter() - start_time  
-    return {
+    result = {
         'algorithm': 'Перебор с ограничениями',
         'solved': solved,
+        'status': status,
+        'time': elapsed,
+        'iterations': stats['iterations'],
+        'backtracks': stats['backtracks'],
+        'solution': puzzle if solved else None
+    }
+    if probe is not None:
+        result['probe'] = probe.snapshot()
+    return result
+
+
+
+# Распространение ограничений
+""" Правила распространения в порядке применения """
+PROPAGATION_RULES = ('naked_singles', 'hidden_singles', 'locked_candidates')
+
+""" Геометрия по числу клеток плоской доски """
+def geometry_for_cells(cells: List[int]) -> SudokuGeometry:
+    return get_geometry(math.isqrt(len(cells)))
+
+""" Плоская доска и маски кандидатов, None - исходные цифры противоречат друг другу """
+def init_candidate_grid(board: List[List[int]]) -> Optional[Tuple[List[int], List[int]]]:
+    geometry = get_geometry(len(board))
+    side = geometry.side
+    cells = [board[i // side][i % side] for i in range(geometry.cells)]
+    cands = [0 if v else geometry.full_mask for v in cells]
+    for i in range(geometry.cells):
+        if cells[i]:
+            bit = 1 << (cells[i] - 1)
+            for p in geometry.peers[i]:
+                if cells[p] == cells[i]:
+                    return None
+                cands[p] &= ~bit
+    return cells, cands
+
+""" Поставить цифру и вычеркнуть её у соседей, False - у соседа не осталось кандидатов """
+def assign_digit(cells: List[int], cands: List[int], index: int, num: int,
+                 geometry: Optional[SudokuGeometry] = None) -> bool:
+    geometry = geometry or geometry_for_cells(cells)
+    bit = 1 << (num - 1)
+    cells[index] = num
+    cands[index] = 0
+    for p in geometry.peers[index]:
+        if cands[p] & bit:
+            cands[p] ^= bit
+            if cands[p] == 0:
+                return False
+    return True
+
+""" Одиночки: клетки с единственным кандидатом """
+def _apply_naked_singles(cells: List[int], cands: List[int], report: dict,
+                         geometry: SudokuGeometry) -> Optional[bool]:
+    changed = False
+    for i in range(geometry.cells):
+        if cells[i] == 0:
+            mask = cands[i]
+            if mask == 0:
+                return None
+            if mask & (mask - 1) == 0:
+                if not assign_digit(cells, cands, i, mask.bit_length(), geometry):
+                    return None
+                report['naked_singles'] += 1
+                changed = True
+    return changed
+
+""" Скрытые одиночки: цифра, которой осталось одно место в группе """
+def _apply_hidden_singles(cells: List[int], cands: List[int], report: dict,
+                          geometry: SudokuGeometry) -> Optional[bool]:
+    changed = False
+    for unit in geometry.all_units:
+        once = 0
+        more = 0
+        placed = 0
+        for i in unit:
+            if cells[i]:
+                placed |= 1 << (cells[i] - 1)
+            else:
+                more |= once & cands[i]
+                once |= cands[i]
+        if (once | placed) != geometry.full_mask:
+            return None
+        singles = once & ~more & ~placed
+        while singles:
+            bit = singles & -singles
+            singles ^= bit
+            for i in unit:
+                if cands[i] & bit:
+                    if not assign_digit(cells, cands, i, bit.bit_length(), geometry):
+                        return None
+                    report['hidden_singles'] += 1
+                    changed = True
+                    break
+    return changed
+
+""" Запертые кандидаты: pointing (блок -> линия) и claiming (линия -> блок) """
+def _apply_locked_candidates(cells: List[int], cands: List[int], report: dict,
+                             geometry: SudokuGeometry) -> Optional[bool]:
+    changed = False
+    for inter, box_rest, line_rest in geometry.box_line_intersections:
+        inter_mask = 0
+        for i in inter:
+            inter_mask |= cands[i]
+        if not inter_mask:
+            continue
+        box_mask = 0
+        for i in box_rest:
+            box_mask |= cands[i]
+        line_mask = 0
+        for i in line_rest:
+            line_mask |= cands[i]
+        for locked, targets in ((inter_mask & ~box_mask & line_mask, line_rest),
+                                (inter_mask & ~line_mask & box_mask, box_rest)):
+            if not locked:
+                continue
+            for i in targets:
+                if cands[i] & locked:
+                    report['locked_candidates'] += (cands[i] & locked).bit_count()
+                    cands[i] &= ~locked
+                    if cands[i] == 0:
+                        return None
+                    changed = True
+    return changed
+
+""" Применение правил до неподвижной точки, False - противоречие """
+def propagate(cells: List[int], cands: List[int], report: dict, geometry: Optional[SudokuGeometry] = None) -> bool:
+    geometry = geometry or geometry_for_cells(cells)
+    for key in PROPAGATION_RULES:
+        report.setdefault(key, 0)
+    rules = (_apply_naked_singles, _apply_hidden_singles, _apply_locked_candidates)
+    while True:
+        for rule in rules:
+            changed = rule(cells, cands, report, geometry)
+            if changed is None:
+                return False
+            if changed:
+                break
+        else:
+            return True
+
+""" Поиск с распространением перед ветвлением и после каждой догадки """
+def _propagated_search(cells: List[int], cands: List[int], stats: dict, control: Optional[SolveControl] = None,
+                       geometry: Optional[SudokuGeometry] = None, probe: Optional[SolverProbe] = None,
+                       depth: int = 0) -> Optional[List[int]]:
+    geometry = geometry or geometry_for_cells(cells)
+    stats['iterations'] += 1
+    if control is not None and stats['iterations'] % CHECK_INTERVAL == 0:
+        control.check(stats)
+    if probe is not None:
+        probe.on_node(depth)
+        started_at = time.perf_counter()
+        consistent = propagate(cells, cands, stats, geometry)
+        probe.candidate_time += time.perf_counter() - started_at
+    else:
+        consistent = propagate(cells, cands, stats, geometry)
+    if not consistent:
+        return None
+    best = -1
+    min_candidates = geometry.side + 1
+    for i in range(geometry.cells):
+        if cells[i] == 0:
+            count = cands[i].bit_count()
+            if count < min_candidates:
+                min_candidates = count
+                best = i
+                if count == 2:
+                    break
+    if best < 0:
+        return cells
+    if probe is not None:
+        probe.on_branch(min_candidates)
+    for num in mask_to_digits(cands[best]):
+        next_cells = cells[:]
+        next_cands = cands[:]
+        if assign_digit(next_cells, next_cands, best, num, geometry):
+            result = _propagated_search(next_cells, next_cands, stats, control, geometry, probe, depth + 1)
+            if result is not None:
+                return result
+        stats['backtracks'] += 1
+    return None
+
+""" Перебор с распространением ограничений; в stats добавляется отчет по правилам """
+def propagated_backtrack_solve(board: List[List[int]], stats: dict, control: Optional[SolveControl] = None,
+                               probe: Optional[SolverProbe] = None) -> bool:
+    for key in PROPAGATION_RULES:
+        stats.setdefault(key, 0)
+    grid = init_candidate_grid(board)
+    if grid is None:
+        return False
+    cells = _propagated_search(grid[0], grid[1], stats, control, probe=probe)
+    if cells is None:
+        return False
+    side = len(board)
+    for i in range(len(cells)):
+        board[i // side][i % side] = cells[i]
+    return True
+
+""" Запуск перебора с распространением ограничений """
+def run_propagation_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                              time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                              progress=None, probe: Optional[SolverProbe] = None) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]
+    stats = {'iterations': 0, 'backtracks': 0}
+    for key in PROPAGATION_RULES:
+        stats[key] = 0
+    control = make_solve_control(control, time_limit, max_iterations, progress)
+    start_time = time.perf_counter()
+    if probe is not None:
+        probe.begin()
+    solved, status = guarded_solve(lambda: propagated_backtrack_solve(puzzle, stats, control, probe))
+    if probe is not None:
+        probe.end()
+    elapsed = time.perf_counter() - start_time
+    result = {
+        'algorithm': 'Перебор с распространением ограничений',
+        'solved': solved,
+        'status': status,
         'time': elapsed,
         'iterations': stats['iterations'],
         'backtracks': stats['backtracks'],
+        'propagation': {key: stats[key] for key in PROPAGATION_RULES},
         'solution': puzzle if solved else None
     }
+    if probe is not None:
+        result['probe'] = probe.snapshot()
+    return result
+
+
+
+# Битовые доски
+""" Таблицы битовых досок по размеру поля: маски соседей каждой клетки, групп, всех клеток
+    и пересечений блок/линия по блокам: (маска блока, [(пересечение, остаток блока, остаток линии)]) """
+_BITBOARD_TABLES = {}
+
+""" Таблицы битовых досок (строятся один раз на размер поля) """
+def _bitboard_tables(side: int) -> Tuple[List[int], List[int], int, list]:
+    tables = _BITBOARD_TABLES.get(side)
+    if tables is None:
+        geometry = get_geometry(side)
+
+        def to_mask(cells: Iterable[int]) -> int:
+            return sum(1 << i for i in cells)
+
+        peer_masks = [to_mask(geometry.peers[i]) for i in range(geometry.cells)]
+        unit_masks = [to_mask(unit) for unit in geometry.all_units]
+        intersections = []
+        for box in geometry.box_units:
+            box_mask = to_mask(box)
+            intersections.append((box_mask, [tuple(to_mask(part) for part in parts)
+                                             for parts in geometry.box_line_intersections
+                                             if to_mask(parts[0]) & box_mask]))
+        tables = _BITBOARD_TABLES[side] = (peer_masks, unit_masks, (1 << geometry.cells) - 1, intersections)
+    return tables
+
+""" Поле как side целых чисел по side^2 бит: cands[d] - клетки, где еще возможна цифра d + 1,
+    placed[d] - клетки с цифрой d + 1, unsolved - незаполненные клетки """
+class Bitboard:
+
+    def __init__(self, board: Optional[List[List[int]]] = None, side: int = 9):
+        if board is None:
+            self.side = side
+            return
+        self.side = side = len(board)
+        self.peer_masks, self.unit_masks, all_cells, self.intersections = _bitboard_tables(side)
+        self.cands = [all_cells] * side
+        self.placed = [0] * side
+        self.unsolved = all_cells
+        self.valid = True
+        for i in range(side * side):
+            value = board[i // side][i % side]
+            if value and not self.place(i, value - 1):
+                self.valid = False
+                return
+
+    """ Независимая копия для ветви перебора """
+    def copy(self) -> 'Bitboard':
+        clone = Bitboard(side=self.side)
+        clone.peer_masks, clone.unit_masks, clone.intersections = self.peer_masks, self.unit_masks, self.intersections
+        clone.cands = self.cands[:]
+        clone.placed = self.placed[:]
+        clone.unsolved = self.unsolved
+        clone.valid = self.valid
+        return clone
+
+    """ Цифра digit + 1 в клетку index: клетка убирается из всех досок кандидатов, цифра - у соседей.
+        False - цифра в клетке уже невозможна """
+    def place(self, index: int, digit: int) -> bool:
+        bit = 1 << index
+        cands = self.cands
+        if not cands[digit] & bit:
+            return False
+        self.placed[digit] |= bit
+        self.unsolved &= ~bit
+        keep = ~bit
+        for d in range(self.side):
+            cands[d] &= keep
+        cands[digit] &= ~self.peer_masks[index]
+        return True
+
+    """ Число кандидатов по клеткам в виде битовых срезов: клетки с не менее чем 1, 2 и 3 кандидатами """
+    def _candidate_counts(self) -> Tuple[int, int, int]:
+        once = twice = thrice = 0
+        for c in self.cands:
+            thrice |= twice & c
+            twice |= once & c
+            once |= c
+        return once, twice, thrice
+
+    """ Одиночки, скрытые одиночки и запертые кандидаты операциями над целыми досками до неподвижной точки.
+        False - противоречие (клетка без кандидатов или цифра без места в группе) """
+    def propagate(self, report: Optional[dict] = None) -> bool:
+        side = self.side
+        cands, placed, unit_masks = self.cands, self.placed, self.unit_masks
+        while True:
+            if not self.unsolved:
+                return True
+            once, twice, _ = self._candidate_counts()
+            if self.unsolved & ~once:
+                return False
+            singles = self.unsolved & ~twice
+            if singles:
+                for d in range(side):
+                    hits = singles & cands[d]
+                    while hits:
+                        low = hits & -hits
+                        hits ^= low
+                        if not self.place(low.bit_length() - 1, d):
+                            return False
+                        if report is not None:
+                            report['naked_singles'] += 1
+                continue
+            progress = False
+            for d in range(side):
+                if not cands[d]:
+                    continue
+                for unit in unit_masks:
+                    hits = cands[d] & unit
+                    if hits & (hits - 1):
+                        continue
+                    if hits:
+                        self.place(hits.bit_length() - 1, d)
+                        progress = True
+                        if report is not None:
+                            report['hidden_singles'] += 1
+                    elif not placed[d] & unit:
+                        return False
+            if progress:
+                continue
+            for d in range(side):
+                before = cands[d]
+                for box_mask, box_intersections in self.intersections:
+                    in_box = cands[d] & box_mask
+                    # Ноль или один кандидат в блоке ничего не запирают
+                    if not in_box & (in_box - 1):
+                        continue
+                    for inter, box_rest, line_rest in box_intersections:
+                        c = cands[d]
+                        if not c & inter:
+                            continue
+                        if c & line_rest and not c & box_rest:
+                            cands[d] = c & ~line_rest
+                        elif c & box_rest and not c & line_rest:
+                            cands[d] = c & ~box_rest
+                if cands[d] != before:
+                    progress = True
+                    if report is not None:
+                        report['locked_candidates'] += (before & ~cands[d]).bit_count()
+            if not progress:
+                return True
+
+    """ Клетка для ветвления: с двумя кандидатами, иначе с тремя, иначе первая незаполненная.
+        Возвращает (клетка, цифры-индексы) """
+    def choose_cell(self) -> Tuple[int, List[int]]:
+        _, twice, thrice = self._candidate_counts()
+        unsolved = self.unsolved
+        pool = unsolved & twice & ~thrice or unsolved & thrice or unsolved
+        low = pool & -pool
+        return low.bit_length() - 1, [d for d in range(self.side) if self.cands[d] & low]
+
+    """ Доска List[List[int]] по доскам поставленных цифр """
+    def to_board(self) -> List[List[int]]:
+        side = self.side
+        cells = [0] * (side * side)
+        for d in range(side):
+            mask = self.placed[d]
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                cells[low.bit_length() - 1] = d + 1
+        return [cells[r * side:(r + 1) * side] for r in range(side)]
+
+""" Перебор на битовых досках: распространение, затем ветвление по клетке с минимумом кандидатов """
+def _bitboard_search(state: Bitboard, stats: dict, control: Optional[SolveControl] = None,
+                     probe: Optional[SolverProbe] = None, depth: int = 0) -> Optional[Bitboard]:
+    stats['iterations'] += 1
+    if control is not None and stats['iterations'] % CHECK_INTERVAL == 0:
+        control.check(stats)
+    if probe is not None:
+        probe.on_node(depth)
+    if not state.propagate():
+        return None
+    if not state.unsolved:
+        return state
+    index, digits = state.choose_cell()
+    if probe is not None:
+        probe.on_branch(len(digits))
+    for digit in digits:
+        child = state.copy()
+        child.place(index, digit)
+        result = _bitboard_search(child, stats, control, probe, depth + 1)
+        if result is not None:
+            return result
+        stats['backtracks'] += 1
+    return None
+
+""" Решение на битовых досках, доска заполняется на месте """
+def bitboard_solve(board: List[List[int]], stats: dict, control: Optional[SolveControl] = None,
+                   probe: Optional[SolverProbe] = None) -> bool:
+    state = Bitboard(board)
+    if not state.valid:
+        return False
+    result = _bitboard_search(state, stats, control, probe)
+    if result is None:
+        return False
+    board[:] = result.to_board()
+    return True
+
+""" Запуск решателя на битовых досках """
+def run_bitboard_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                           time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                           progress=None, probe: Optional[SolverProbe] = None) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]
+    stats = {'iterations': 0, 'backtracks': 0}
+    control = make_solve_control(control, time_limit, max_iterations, progress)
+    start_time = time.perf_counter()
+    if probe is not None:
+        probe.begin()
+    solved, status = guarded_solve(lambda: bitboard_solve(puzzle, stats, control, probe))
+    if probe is not None:
+        probe.end()
+    elapsed = time.perf_counter() - start_time
+    result = {
+        'algorithm': 'Битовые доски',
+        'solved': solved,
+        'status': status,
+        'time': elapsed,
+        'iterations': stats['iterations'],
+        'backtracks': stats['backtracks'],
+        'solution': puzzle if solved else None
+    }
+    if probe is not None:
+        result['probe'] = probe.snapshot()
+    return result
 
 
 
@@ -184,15 +1115,16 @@ class DLinksNode:
         self.col_id = -1  
         self.size = 0  
 
-""" Реализация алгоритма """
-class DancingLinksSolver:
+""" Реализация алгоритма на объектах-узлах (исходная версия, оставлена для сравнения) """
+class NodeDancingLinksSolver:
     
     def __init__(self, puzzle: List[List[int]]):
         self.puzzle = puzzle  
         self.header = DLinksNode()  
         self.solution = []  
         self.solution_rows = []  
-        self.columns = 324  
+        self.geometry = get_geometry(len(puzzle))
+        self.columns = self.geometry.dlx_columns  
         self.total_rows = 0  
         self.rows_data = []  
         self._create_matrix()  
@@ -212,18 +1144,13 @@ class DancingLinksSolver:
             self.header.left = col_node
             prev = col_node
             column_nodes.append(col_node)  
-        for row in range(9):  
-            for col in range(9):  
-                for num in range(1, 10):  
+        side = self.geometry.side
+        for row in range(side):  
+            for col in range(side):  
+                for num in range(1, side + 1):  
                     if self.puzzle[row][col] != 0 and self.puzzle[row][col] != num:
                         continue
-                    
-                    cell_constraint = row * 9 + col  
-                    row_constraint = 81 + row * 9 + (num - 1)  
-                    col_constraint = 162 + col * 9 + (num - 1)  
-                    block = (row // 3) * 3 + (col // 3)  
-                    block_constraint = 243 + block * 9 + (num - 1)  
-                    constraints = [cell_constraint, row_constraint, col_constraint, block_constraint]
+                    constraints = self.geometry.dlx_constraints(row, col, num)
                     
                     row_nodes = []
                     for constraint in constraints:
@@ -319,77 +1246,2854 @@ class DancingLinksSolver:
 
     """ Преобразование решения """
     def get_solution_board(self) -> List[List[int]]:
-        solution_board = [[0 for _ in range(9)] for _ in range(9)]  
+        side = self.geometry.side
+        solution_board = [[0 for _ in range(side)] for _ in range(side)]  
         for row_id in self.solution_rows:
             row, col, num = self.rows_data[row_id]  
             solution_board[row][col] = num  
         return solution_board  
 
+""" Фазы итеративного поиска """
+PHASE_IDLE = 'idle'
+PHASE_DESCEND = 'descend'
+PHASE_BACKTRACK = 'backtrack'
+PHASE_FOUND = 'found'
+PHASE_DONE = 'done'
+
+""" Стратегии выбора столбца: имя -> метод ExactCoverSolver.
+    'min' - первый столбец минимального размера (полный проход по заголовкам),
+    'min-early' - то же, но проход обрывается на столбце размера 0 или 1,
+    'random' - случайный из столбцов минимального размера,
+    'buckets' - очередь столбцов по размерам, которую поддерживают _cover/_uncover (порядок равных
+    столбцов внутри списка зависит от истории покрытий, состав списков восстанавливается точно) """
+COLUMN_STRATEGIES = {
+    'min': '_choose_column',
+    'min-early': '_choose_column_early',
+    'random': '_choose_column_random',
+    'buckets': '_choose_column_bucketed',
+}
+
+""" Реализация алгоритма на плоских массивах связей: узел - индекс в списках L/R/U/D/C """
+class ExactCoverSolver:
+
+    """ Точное покрытие: primary обязательных столбцов (каждый покрывается ровно одной строкой) и
+        secondary необязательных (не больше одной строкой). rows - строки как наборы номеров столбцов
+        0..primary+secondary-1, номер строки - её порядковый номер (row_of узла, solution_rows).
+        strategy - выбор столбца из COLUMN_STRATEGIES, strategy_seed - начальное значение для 'random' """
+    def __init__(self, primary: int, rows: Iterable[Iterable[int]] = (), secondary: int = 0,
+                 strategy: str = 'min', strategy_seed: Optional[int] = None):
+        if strategy not in COLUMN_STRATEGIES:
+            raise ValueError(f"неизвестная стратегия выбора столбца {strategy!r}")
+        self.strategy = strategy
+        self.primary = primary
+        self.secondary = secondary
+        self.columns = primary + secondary
+        # 0 - корневой заголовок, 1..columns - заголовки столбцов, дальше узлы строк
+        self.L = []
+        self.R = []
+        self.U = []
+        self.D = []
+        self.C = []
+        self.row_of = []
+        self.size = []
+        self.solution = []
+        self.solution_rows = []
+        self.total_rows = 0
+        self.row_nodes = []
+        self.phase = PHASE_IDLE
+        self._create_headers()
+        for row in rows:
+            self.add_row(row)
+        self._choose_column = getattr(self, COLUMN_STRATEGIES[strategy])
+        if strategy == 'random':
+            self.tie_rng = random.Random(strategy_seed)
+        elif strategy == 'buckets':
+            self._create_buckets()
+            self._cover = self._cover_bucketed
+            self._uncover = self._uncover_bucketed
+
+    """ Добавление узла, связанного сам с собой """
+    def _new_node(self, column: int, row_id: int) -> int:
+        node = len(self.L)
+        self.L.append(node)
+        self.R.append(node)
+        self.U.append(node)
+        self.D.append(node)
+        self.C.append(column)
+        self.row_of.append(row_id)
+        self.size.append(0)
+        return node
+
+    """ Заголовки: обязательные столбцы в кольце корня, необязательные связаны сами с собой
+        (поэтому никогда не выбираются, но покрываются вместе со строками) """
+    def _create_headers(self):
+        L, R = self.L, self.R
+        self._new_node(0, -1)
+        for i in range(self.columns):
+            col_node = self._new_node(i + 1, -1)
+            if i < self.primary:
+                L[col_node] = col_node - 1
+                R[col_node] = 0
+                R[col_node - 1] = col_node
+                L[0] = col_node
+
+    """ Добавление строки по номерам столбцов, возвращает номер строки """
+    def add_row(self, columns: Iterable[int]) -> int:
+        L, R, U, D = self.L, self.R, self.U, self.D
+        columns = list(columns)
+        if not columns or len(set(columns)) != len(columns):
+            raise ValueError(f"строка {self.total_rows}: нужен непустой набор разных столбцов")
+        first = None
+        for constraint in columns:
+            if not 0 <= constraint < self.columns:
+                raise ValueError(f"строка {self.total_rows}: нет столбца {constraint}")
+            column = constraint + 1
+            node = self._new_node(column, self.total_rows)
+            last = U[column]
+            U[node] = last
+            D[node] = column
+            D[last] = node
+            U[column] = node
+            self.size[column] += 1
+            if first is None:
+                first = node
+                self.row_nodes.append(node)
+            else:
+                L[node] = node - 1
+                R[node] = first
+                R[node - 1] = node
+                L[first] = node
+        self.total_rows += 1
+        return self.total_rows - 1
+
+    """ Удаление столбца и связанных строк """
+    def _cover(self, column: int):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        R[L[column]] = R[column]
+        L[R[column]] = L[column]
+        row = D[column]
+        while row != column:
+            node = R[row]
+            while node != row:
+                up, down = U[node], D[node]
+                U[down] = up
+                D[up] = down
+                size[C[node]] -= 1
+                node = R[node]
+            row = D[row]
+
+    """ Восстановление столбца и связанных строк """
+    def _uncover(self, column: int):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        row = U[column]
+        while row != column:
+            node = L[row]
+            while node != row:
+                U[D[node]] = node
+                D[U[node]] = node
+                size[C[node]] += 1
+                node = L[node]
+            row = U[row]
+        R[L[column]] = column
+        L[R[column]] = column
+
+    """ Столбец с минимальным числом узлов (первый из равных) """
+    def _choose_column(self) -> Tuple[int, int]:
+        R, size = self.R, self.size
+        min_col = 0
+        min_size = 1 << 30
+        col = R[0]
+        while col != 0:
+            if size[col] < min_size:
+                min_size = size[col]
+                min_col = col
+            col = R[col]
+        return min_col, min_size
+
+    """ Первый столбец минимального размера, проход обрывается на размере 0 или 1 """
+    def _choose_column_early(self) -> Tuple[int, int]:
+        R, size = self.R, self.size
+        min_col = 0
+        min_size = 1 << 30
+        col = R[0]
+        while col != 0:
+            if size[col] < min_size:
+                min_size = size[col]
+                min_col = col
+                if min_size <= 1:
+                    break
+            col = R[col]
+        return min_col, min_size
+
+    """ Случайный столбец из столбцов минимального размера """
+    def _choose_column_random(self) -> Tuple[int, int]:
+        R, size = self.R, self.size
+        min_size = 1 << 30
+        ties = []
+        col = R[0]
+        while col != 0:
+            if size[col] < min_size:
+                min_size = size[col]
+                ties = [col]
+            elif size[col] == min_size:
+                ties.append(col)
+            col = R[col]
+        return self.tie_rng.choice(ties), min_size
+
+    """ Очередь обязательных столбцов по размерам: кольцевые списки BN/BP, заголовок списка размера s -
+        bucket_base + s (необязательные столбцы, номера больше primary, в очередь не входят) """
+    def _create_buckets(self):
+        max_size = max(self.size[1:self.primary + 1], default=0)
+        self.bucket_base = self.columns + 1
+        self.max_bucket = max_size
+        heads = range(self.bucket_base, self.bucket_base + max_size + 1)
+        self.BN = list(range(self.bucket_base)) + list(heads)
+        self.BP = list(self.BN)
+        # Вставка в начало списка: обход в обратном порядке оставляет столбцы в исходном порядке
+        col = self.L[0]
+        while col != 0:
+            self._bucket_insert(col)
+            col = self.L[col]
+
+    """ Столбец в список своего размера """
+    def _bucket_insert(self, column: int):
+        BN, BP = self.BN, self.BP
+        head = self.bucket_base + self.size[column]
+        BN[column] = BN[head]
+        BP[column] = head
+        BP[BN[head]] = column
+        BN[head] = column
+
+    """ Столбец из списка своего размера """
+    def _bucket_remove(self, column: int):
+        BN, BP = self.BN, self.BP
+        BN[BP[column]] = BN[column]
+        BP[BN[column]] = BP[column]
+
+    """ _cover с переносом столбцов между списками размеров """
+    def _cover_bucketed(self, column: int):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        BN, BP, base, primary = self.BN, self.BP, self.bucket_base, self.primary
+        R[L[column]] = R[column]
+        L[R[column]] = L[column]
+        BN[BP[column]] = BN[column]
+        BP[BN[column]] = BP[column]
+        row = D[column]
+        while row != column:
+            node = R[row]
+            while node != row:
+                up, down = U[node], D[node]
+                U[down] = up
+                D[up] = down
+                other = C[node]
+                size[other] -= 1
+                if other > primary:
+                    node = R[node]
+                    continue
+                BN[BP[other]] = BN[other]
+                BP[BN[other]] = BP[other]
+                head = base + size[other]
+                BN[other] = BN[head]
+                BP[other] = head
+                BP[BN[head]] = other
+                BN[head] = other
+                node = R[node]
+            row = D[row]
+
+    """ _uncover с переносом столбцов между списками размеров """
+    def _uncover_bucketed(self, column: int):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        BN, BP, base, primary = self.BN, self.BP, self.bucket_base, self.primary
+        row = U[column]
+        while row != column:
+            node = L[row]
+            while node != row:
+                U[D[node]] = node
+                D[U[node]] = node
+                other = C[node]
+                size[other] += 1
+                if other > primary:
+                    node = L[node]
+                    continue
+                BN[BP[other]] = BN[other]
+                BP[BN[other]] = BP[other]
+                head = base + size[other]
+                BN[other] = BN[head]
+                BP[other] = head
+                BP[BN[head]] = other
+                BN[head] = other
+                node = L[node]
+            row = U[row]
+        R[L[column]] = column
+        L[R[column]] = column
+        if column <= primary:
+            self._bucket_insert(column)
+
+    """ Первый столбец непустого списка наименьшего размера """
+    def _choose_column_bucketed(self) -> Tuple[int, int]:
+        BN, base = self.BN, self.bucket_base
+        for bucket_size in range(self.max_bucket + 1):
+            head = base + bucket_size
+            if BN[head] != head:
+                return BN[head], bucket_size
+        return 0, 1 << 30
+
+    """ Выбор строки: покрытие остальных столбцов строки """
+    def _select_row(self, row: int):
+        R, C = self.R, self.C
+        node = R[row]
+        while node != row:
+            self._cover(C[node])
+            node = R[node]
+
+    """ Отмена выбора строки в обратном порядке """
+    def _deselect_row(self, row: int):
+        L, C = self.L, self.C
+        node = L[row]
+        while node != row:
+            self._uncover(C[node])
+            node = L[node]
+
+    """ Начало поиска: стек кадров пуст, следующий шаг - спуск в корень.
+        prefix - заранее выбранные строки: поиск идет только в их поддереве """
+    def start_search(self, stats: dict, control: Optional[SolveControl] = None, prefix: Optional[List[int]] = None,
+                     probe: Optional[SolverProbe] = None):
+        self.abort_search()
+        self.stats = stats
+        self.control = control
+        self.probe = probe
+        self.push_frames(prefix or [])
+        self.floor = len(self.frames)
+        self.phase = PHASE_DESCEND
+
+    """ Выбор строк по порядку, как если бы поиск спустился по ним """
+    def push_frames(self, rows: List[int]):
+        if not hasattr(self, 'frames'):
+            self.frames = []
+        for row in rows:
+            self._cover(self.C[row])
+            self._select_row(row)
+            self.frames.append(row)
+
+    """ Сам алгоритм Dancing Links: итеративный поиск с явным стеком, не больше budget узлов за вызов.
+        True - найдено решение, False - решений больше нет, None - бюджет исчерпан (поиск на паузе) """
+    def step(self, budget: Optional[int] = None) -> Optional[bool]:
+        L, R, D, C = self.L, self.R, self.D, self.C
+        cover, uncover, choose_column = self._cover, self._uncover, self._choose_column
+        stats, frames, floor = self.stats, self.frames, self.floor
+        control = getattr(self, 'control', None)
+        probe = getattr(self, 'probe', None)
+        phase = self.phase
+        nodes = 0
+        while True:
+            if phase == PHASE_DESCEND:
+                if budget is not None and nodes >= budget:
+                    self.phase = phase
+                    return None
+                nodes += 1
+                stats['iterations'] += 1
+                if control is not None and stats['iterations'] % CHECK_INTERVAL == 0:
+                    self.phase = phase
+                    control.check(stats)
+                if probe is not None:
+                    probe.on_node(len(frames))
+                if R[0] == 0:
+                    self.phase = PHASE_FOUND
+                    self.solution = frames[:]
+                    self.solution_rows = [self.row_of[row] for row in frames]
+                    return True
+                min_col, min_size = choose_column()
+                if probe is not None:
+                    probe.on_branch(min_size)
+                if min_size == 0:
+                    phase = PHASE_BACKTRACK
+                    continue
+                cover(min_col)
+                row = D[min_col]
+                frames.append(row)
+                node = R[row]
+                while node != row:
+                    cover(C[node])
+                    node = R[node]
+                if probe is not None:
+                    probe.covers += self._row_length(row)
+            elif phase == PHASE_BACKTRACK:
+                if len(frames) <= floor:
+                    self.phase = PHASE_DONE
+                    return False
+                row = frames.pop()
+                node = L[row]
+                while node != row:
+                    uncover(C[node])
+                    node = L[node]
+                stats['backtracks'] += 1
+                column = C[row]
+                if probe is not None:
+                    probe.uncovers += self._row_length(row) - 1
+                row = D[row]
+                if row != column:
+                    frames.append(row)
+                    node = R[row]
+                    while node != row:
+                        cover(C[node])
+                        node = R[node]
+                    if probe is not None:
+                        probe.covers += self._row_length(row) - 1
+                    phase = PHASE_DESCEND
+                else:
+                    uncover(column)
+                    if probe is not None:
+                        probe.uncovers += 1
+            elif phase == PHASE_FOUND:
+                # продолжение после найденного решения - поиск следующего
+                phase = PHASE_BACKTRACK
+            else:
+                self.phase = phase
+                return False
+
+    """ Число узлов в строке матрицы """
+    def _row_length(self, row: int) -> int:
+        R = self.R
+        length = 1
+        node = R[row]
+        while node != row:
+            length += 1
+            node = R[node]
+        return length
+
+    """ Прерывание поиска с восстановлением матрицы """
+    def abort_search(self):
+        frames = getattr(self, 'frames', [])
+        self.floor = 0
+        while frames:
+            row = frames.pop()
+            self._deselect_row(row)
+            self._uncover(self.C[row])
+        self.phase = PHASE_IDLE
+
+    """ Поиск первого решения (solution - узлы строк, solution_rows - их номера) """
+    def solve(self, stats: dict, control: Optional[SolveControl] = None, probe: Optional[SolverProbe] = None) -> bool:
+        self.solution = []
+        self.solution_rows = []
+        self.start_search(stats, control, probe=probe)
+        try:
+            return self.step()
+        finally:
+            # матрица восстанавливается, чтобы решатель можно было переиспользовать
+            self.abort_search()
+
+    """ Перемешивать строки можно только в полностью раскрытой матрице: строки, снятые покрытием
+        (в том числе исходные цифры load_puzzle), вернулись бы к прежним соседям и порвали списки """
+    def _require_uncovered(self):
+        if getattr(self, 'given_rows', None) or getattr(self, 'frames', None):
+            raise ValueError("матрица частично покрыта: сначала unload_puzzle()/abort_search()")
+        R = self.R
+        linked = 0
+        column = R[0]
+        while column != 0:
+            linked += 1
+            column = R[column]
+        if linked != self.primary:
+            raise ValueError("матрица частично покрыта: в кольце корня не все обязательные столбцы")
+
+    """ Случайный порядок строк в каждом столбце (порядок перебора ветвей); только вне поиска,
+        с раскрытыми столбцами, иначе ValueError. Номера строк и горизонтальные связи не меняются """
+    def shuffle_rows(self, rng: random.Random):
+        self._require_uncovered()
+        U, D = self.U, self.D
+        for column in range(1, self.columns + 1):
+            nodes = []
+            node = D[column]
+            while node != column:
+                nodes.append(node)
+                node = D[node]
+            rng.shuffle(nodes)
+            previous = column
+            for node in nodes:
+                D[previous] = node
+                U[node] = previous
+                previous = node
+            D[previous] = column
+            U[column] = previous
+
+    """ Поиск со случайными перезапусками: перед запуском строки перемешиваются (и rng выбирает среди
+        равных столбцов при стратегии 'random'), запуск обрывается после очередного бюджета узлов из budgets.
+        Число оборванных запусков - в stats['restarts']. Только на матрице без подставленной головоломки
+        (DancingLinksSolver(puzzle), не load_puzzle), иначе ValueError """
+    def solve_with_restarts(self, stats: dict, rng: random.Random, budgets: Iterator[int],
+                            control: Optional[SolveControl] = None, probe: Optional[SolverProbe] = None) -> bool:
+        self.abort_search()
+        self._require_uncovered()
+        stats.setdefault('restarts', 0)
+        if self.strategy == 'random':
+            self.tie_rng = rng
+        self.solution = []
+        self.solution_rows = []
+        try:
+            for budget in budgets:
+                self.abort_search()
+                self.shuffle_rows(rng)
+                self.start_search(stats, control, probe=probe)
+                found = self.step(budget)
+                if found is not None:
+                    return found
+                stats['restarts'] += 1
+            return False
+        finally:
+            self.abort_search()
+
+    """ Ленивый перебор решений как списков номеров строк """
+    def iter_solution_rows(self, stats: dict, control: Optional[SolveControl] = None) -> Iterator[List[int]]:
+        self.start_search(stats, control)
+        try:
+            while self.step():
+                yield self.solution_rows[:]
+        finally:
+            self.abort_search()
+
+    """ Первое решение (номера строк), None - решения нет """
+    def first(self, stats: Optional[dict] = None, control: Optional[SolveControl] = None) -> Optional[List[int]]:
+        stats = stats if stats is not None else {'iterations': 0, 'backtracks': 0}
+        return self.solution_rows[:] if self.solve(stats, control) else None
+
+    """ Все решения (не больше limit) """
+    def all(self, limit: Optional[int] = None, stats: Optional[dict] = None,
+            control: Optional[SolveControl] = None) -> List[List[int]]:
+        stats = stats if stats is not None else {'iterations': 0, 'backtracks': 0}
+        return list(itertools.islice(self.iter_solution_rows(stats, control), limit))
+
+    """ Число решений (поиск останавливается на limit) """
+    def count(self, limit: Optional[int] = None, stats: Optional[dict] = None,
+              control: Optional[SolveControl] = None) -> int:
+        stats = stats if stats is not None else {'iterations': 0, 'backtracks': 0}
+        return sum(1 for _ in itertools.islice(self.iter_solution_rows(stats, control), limit))
+
+    """ Развертка первых уровней дерева поиска в независимые подзадачи (префиксы выбранных строк).
+        Возвращает (решение, найденное при развертке, или None; список префиксов) """
+    def expand_subproblems(self, min_tasks: int, stats: dict,
+                           max_depth: int = 8) -> Tuple[Optional[List[int]], List[List[int]]]:
+        D = self.D
+        frontier = [[]]
+        depth = 0
+        while frontier and len(frontier) < min_tasks and depth < max_depth:
+            next_frontier = []
+            for prefix in frontier:
+                self.push_frames(prefix)
+                stats['iterations'] += 1
+                try:
+                    if self.R[0] == 0:
+                        return prefix, []
+                    column, size = self._choose_column()
+                    if size == 0:
+                        stats['backtracks'] += 1
+                        continue
+                    row = D[column]
+                    while row != column:
+                        next_frontier.append(prefix + [row])
+                        row = D[row]
+                finally:
+                    self.abort_search()
+            frontier = next_frontier
+            depth += 1
+        return None, frontier
+
+""" Судоку поверх точного покрытия: строка матрицы - (клетка, число), столбцы - ограничения поля """
+class DancingLinksSolver(ExactCoverSolver):
+
+    """ puzzle=None - полная матрица (side^3 строк, для 9x9 - 729), головоломка подставляется через load_puzzle.
+        rng - строки добавляются в случайном порядке, и перебор идет по ним в этом порядке (случайное решение).
+        strategy - выбор столбца из COLUMN_STRATEGIES, strategy_seed - начальное значение для 'random' """
+    def __init__(self, puzzle: Optional[List[List[int]]] = None, side: int = 9, rng: Optional[random.Random] = None,
+                 strategy: str = 'min', strategy_seed: Optional[int] = None):
+        self.puzzle = puzzle
+        self.rng = rng
+        self.geometry = get_geometry(len(puzzle) if puzzle is not None else side)
+        self.given_rows = []
+        self.prebuilt = puzzle is None
+        side = self.geometry.side
+        candidates = [
+            (row, col, num)
+            for row in range(side) for col in range(side) for num in range(1, side + 1)
+            if puzzle is None or puzzle[row][col] in (0, num)
+        ]
+        if rng is not None:
+            rng.shuffle(candidates)
+        self.rows_data = candidates
+        rows = (self.geometry.dlx_constraints(row, col, num) for row, col, num in candidates)
+        super().__init__(self.geometry.dlx_columns, rows, strategy=strategy, strategy_seed=strategy_seed)
+        if rng is not None:
+            # row_nodes остается в порядке (клетка, число), как его использует load_puzzle
+            order = sorted(range(self.total_rows), key=lambda i: self.rows_data[i])
+            self.row_nodes = [self.row_nodes[i] for i in order]
+
+    """ Ленивый перебор всех решений: следующее ищется только при запросе """
+    def iter_solutions(self, stats: dict, control: Optional[SolveControl] = None) -> Iterator[List[List[int]]]:
+        self.start_search(stats, control)
+        try:
+            while self.step():
+                yield self.get_solution_board()
+        finally:
+            self.abort_search()
+
+    """ Сериализуемое (JSON) состояние поиска: головоломка, выбранные строки, фаза и статистика """
+    def get_search_state(self) -> dict:
+        return {
+            'puzzle': [row[:] for row in self.puzzle] if self.puzzle is not None else None,
+            'prebuilt': self.prebuilt,
+            'frames': list(getattr(self, 'frames', [])),
+            'floor': getattr(self, 'floor', 0),
+            'phase': self.phase,
+            'stats': dict(getattr(self, 'stats', {})),
+            'strategy': self.strategy,
+        }
+
+    """ Восстановление поиска из get_search_state(); продолжать через step() """
+    @classmethod
+    def from_search_state(cls, state: dict) -> 'DancingLinksSolver':
+        strategy = state.get('strategy', 'min')
+        if state['prebuilt']:
+            solver = cls(strategy=strategy)
+            if state['puzzle'] is not None:
+                solver.load_puzzle(state['puzzle'])
+        else:
+            solver = cls(state['puzzle'], strategy=strategy)
+        solver.stats = dict(state['stats'])
+        solver.frames = []
+        solver.push_frames(state['frames'])
+        solver.floor = state.get('floor', 0)
+        solver.phase = state['phase']
+        return solver
+
+    """ Подстановка головоломки в полную матрицу: покрытие строк исходных цифр, False - противоречие.
+        Матрица DancingLinksSolver(puzzle) содержит только строки своей головоломки - для нее ValueError """
+    def load_puzzle(self, puzzle: List[List[int]]) -> bool:
+        if not self.prebuilt:
+            raise ValueError("подстановка возможна только в полную матрицу (DancingLinksSolver(puzzle=None))")
+        L, R, C = self.L, self.R, self.C
+        self.abort_search()
+        self.unload_puzzle()
+        side = self.geometry.side
+        if len(puzzle) != side:
+            raise ValueError(f"матрица построена для поля {side}x{side}, а получено {len(puzzle)}x{len(puzzle)}")
+        self.puzzle = puzzle
+        for row in range(side):
+            for col in range(side):
+                num = puzzle[row][col]
+                if num == 0:
+                    continue
+                first = self.row_nodes[(row * side + col) * side + num - 1]
+                node = first
+                while True:
+                    column = C[node]
+                    if R[L[column]] != column:
+                        return False
+                    node = R[node]
+                    if node == first:
+                        break
+                self.given_rows.append(first)
+                node = first
+                while True:
+                    self._cover(C[node])
+                    node = R[node]
+                    if node == first:
+                        break
+        return True
+
+    """ Снятие головоломки: раскрытие строк исходных цифр в обратном порядке """
+    def unload_puzzle(self):
+        L, C = self.L, self.C
+        self.abort_search()
+        while self.given_rows:
+            first = self.given_rows.pop()
+            node = L[first]
+            while node != first:
+                self._uncover(C[node])
+                node = L[node]
+            self._uncover(C[first])
+        self.solution = []
+        self.solution_rows = []
+
+    """ Решение одной головоломки на заранее построенной матрице, None - решения нет """
+    def solve_puzzle(self, puzzle: List[List[int]], stats: dict, control: Optional[SolveControl] = None,
+                     probe: Optional[SolverProbe] = None) -> Optional[List[List[int]]]:
+        try:
+            if self.load_puzzle(puzzle) and self.solve(stats, control, probe):
+                return self.get_solution_board()
+            return None
+        finally:
+            self.unload_puzzle()
+
+    """ Преобразование решения """
+    def get_solution_board(self) -> List[List[int]]:
+        side = self.geometry.side
+        solution_board = [[0 for _ in range(side)] for _ in range(side)]
+        for row_id in [self.row_of[node] for node in self.given_rows] + self.solution_rows:
+            row, col, num = self.rows_data[row_id]
+            solution_board[row][col] = num
+        return solution_board
+
+""" Точное покрытие одной функцией. mode: 'first' - номера строк первого решения или None,
+    'all' - список решений (не больше limit), 'count' - число решений (до limit) """
+def solve_exact_cover(rows: Iterable[Iterable[int]], primary: int, secondary: int = 0, mode: str = 'first',
+                      limit: Optional[int] = None, strategy: str = 'min', stats: Optional[dict] = None,
+                      control: Optional[SolveControl] = None):
+    solver = ExactCoverSolver(primary, rows, secondary, strategy=strategy)
+    if mode == 'first':
+        return solver.first(stats, control)
+    if mode == 'all':
+        return solver.all(limit, stats, control)
+    if mode == 'count':
+        return solver.count(limit, stats, control)
+    raise ValueError(f"неизвестный режим {mode!r}")
+
+""" Ферзи n x n как точное покрытие: обязательные столбцы - строки и столбцы доски,
+    необязательные - диагонали. Возвращает (строки матрицы, primary, secondary, клетки строк) """
+def n_queens_cover(n: int) -> Tuple[List[List[int]], int, int, List[Tuple[int, int]]]:
+    rows, cells = [], []
+    for row in range(n):
+        for col in range(n):
+            rows.append([row, n + col, 2 * n + row + col, 4 * n - 1 + (row - col + n - 1)])
+            cells.append((row, col))
+    return rows, 2 * n, 2 * (2 * n - 1), cells
+
+""" Полные матрицы строятся один раз на процесс (по одной на размер поля) """
+_TEMPLATE_SOLVERS = {}
+
+""" Общий для процесса решатель с заранее построенной матрицей """
+def get_template_solver(side: int = 9) -> DancingLinksSolver:
+    solver = _TEMPLATE_SOLVERS.get(side)
+    if solver is None:
+        solver = _TEMPLATE_SOLVERS[side] = DancingLinksSolver(side=side)
+    return solver
+
+""" Сравнение узловой и массивной реализаций: время построения, поиска и память на экземпляр """
+def benchmark_dancing_links(puzzles: List[List[List[int]]], repeats: int = 5) -> List[dict]:
+    results = []
+    for solver_class in (NodeDancingLinksSolver, DancingLinksSolver):
+        build_time = 0.0
+        search_time = 0.0
+        iterations = 0
+        for _ in range(repeats):
+            for puzzle in puzzles:
+                stats = {'iterations': 0, 'backtracks': 0}
+                start_time = time.perf_counter()
+                solver = solver_class([row[:] for row in puzzle])
+                built_time = time.perf_counter()
+                solver.solve(stats)
+                search_time += time.perf_counter() - built_time
+                build_time += built_time - start_time
+                iterations += stats['iterations']
+        tracemalloc.start()
+        solver = solver_class([row[:] for row in puzzles[0]])
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        runs = repeats * len(puzzles)
+        results.append({
+            'solver': solver_class.__name__,
+            'build_ms': build_time / runs * 1000,
+            'search_ms': search_time / runs * 1000,
+            'iterations': iterations // repeats,
+            'memory_kb': memory / 1024,
+        })
+    return results
+
+""" Сравнение стратегий выбора столбца на корпусе: узлы, откаты и время поиска (медиана) на уровень """
+def benchmark_column_strategies(levels: Optional[List[str]] = None, strategies: Optional[List[str]] = None,
+                                repeats: int = 3, seed: int = 1) -> List[dict]:
+    results = []
+    for level in levels or list(SUDOKU_CORPUS):
+        puzzles = [parse_puzzle_line(line) for line in SUDOKU_CORPUS[level]]
+        for strategy in strategies or list(COLUMN_STRATEGIES):
+            times = []
+            iterations = backtracks = 0
+            for _ in range(repeats):
+                elapsed = 0.0
+                iterations = backtracks = 0
+                for index, puzzle in enumerate(puzzles):
+                    stats = {'iterations': 0, 'backtracks': 0}
+                    solver = DancingLinksSolver(puzzle, strategy=strategy, strategy_seed=seed + index)
+                    start_time = time.perf_counter()
+                    solver.solve(stats)
+                    elapsed += time.perf_counter() - start_time
+                    iterations += stats['iterations']
+                    backtracks += stats['backtracks']
+                times.append(elapsed)
+            times.sort()
+            results.append({
+                'level': level,
+                'strategy': strategy,
+                'puzzles': len(puzzles),
+                'iterations': iterations,
+                'backtracks': backtracks,
+                'median_ms': _percentile(times, 50) * 1000,
+            })
+    return results
+
+""" Таблица сравнения стратегий """
+def print_column_strategies(results: List[dict]):
+    print(f"{'Уровень':<12} {'Стратегия':<10} {'Узлы':>8} {'Откаты':>8} {'Медиана, мс':>12}")
+    for result in results:
+        print(f"{result['level']:<12} {result['strategy']:<10} {result['iterations']:>8} "
+              f"{result['backtracks']:>8} {result['median_ms']:>12.2f}")
+
 """ Запуск алгоритма Dancing Links """
-def run_dancing_links_algorithm() -> dict:
-    puzzle = [row[:] for row in ORIGINAL_PUZZLE]  
+def run_dancing_links_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                                prebuilt: bool = False, time_limit: Optional[float] = None,
+                                max_iterations: Optional[int] = None, progress=None,
+                                probe: Optional[SolverProbe] = None) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]  
     stats = {'iterations': 0, 'backtracks': 0}  
+    control = make_solve_control(control, time_limit, max_iterations, progress)
     start_time = time.perf_counter()  
-    solver = DancingLinksSolver(puzzle)  
-    solved = solver.solve(stats)  
+    if probe is not None:
+        probe.begin()
+    if prebuilt:
+        template = get_template_solver(len(puzzle))
+        solution = None
+
+        def solve_on_template() -> bool:
+            nonlocal solution
+            solution = template.solve_puzzle(puzzle, stats, control, probe)
+            return solution is not None
+
+        solved, status = guarded_solve(solve_on_template)
+    else:
+        solver = DancingLinksSolver(puzzle)  
+        solved, status = guarded_solve(lambda: solver.solve(stats, control, probe))
+        solution = solver.get_solution_board() if solved else None  
+    if probe is not None:
+        probe.end()
     elapsed = time.perf_counter() - start_time  
-    solution = solver.get_solution_board() if solved else None  
-    return {
-        'algorithm': 'Dancing Links',
+    result = {
+        'algorithm': 'Dancing Links (готовая матрица)' if prebuilt else 'Dancing Links',
         'solved': solved,
+        'status': status,
         'time': elapsed,
         'iterations': stats['iterations'],
         'backtracks': stats['backtracks'],
         'solution': solution
     }
+    if probe is not None:
+        result['probe'] = probe.snapshot()
+    return result
+
+
+
+# Случайные перезапуски
+""" Бюджет первого запуска (узлов) и множитель геометрического расписания. На сгенерированных
+    головоломках 9x9 перебор с ограничениями лучше всего срезает хвост с base=2048 и геометрическим
+    расписанием; Dancing Links с выбором минимального столбца тяжелого хвоста почти не имеет """
+RESTART_BASE = 2048
+RESTART_FACTOR = 1.5
+
+""" i-й член последовательности Luby (1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...), i от 1 """
+def luby(i: int) -> int:
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+""" Бесконечная последовательность бюджетов узлов: 'luby' - base * luby(i), 'geometric' - base * factor^i """
+def restart_budgets(schedule: str = 'geometric', base: int = RESTART_BASE,
+                    factor: float = RESTART_FACTOR) -> Iterator[int]:
+    if schedule == 'luby':
+        return (base * luby(i) for i in itertools.count(1))
+    if schedule == 'geometric':
+        return (max(1, int(base * factor ** i)) for i in itertools.count())
+    raise ValueError(f"неизвестное расписание перезапусков {schedule!r}")
+
+""" Перебор с ограничениями, оборванный после limit узлов (всего, по stats): None - бюджет исчерпан.
+    Равные по числу кандидатов клетки и порядок цифр выбирает rng """
+def _randomized_constrained_search(masks: CandidateMasks, stats: dict, rng: random.Random, limit: int,
+                                   control: Optional[SolveControl] = None, probe: Optional[SolverProbe] = None,
+                                   depth: int = 0) -> Optional[bool]:
+    if stats['iterations'] >= limit:
+        return None
+    stats['iterations'] += 1
+    if control is not None and stats['iterations'] % CHECK_INTERVAL == 0:
+        control.check(stats)
+    if probe is not None:
+        probe.on_node(depth)
+    cell_info = masks.random_constrained_cell(rng)
+    if not cell_info:
+        for row, col, _ in masks.empty_cells:
+            if masks.board[row][col] == 0:
+                return False
+        return True
+    row, col, box, mask = cell_info
+    if probe is not None:
+        probe.on_branch(mask.bit_count())
+    digits = mask_to_digits(mask)
+    rng.shuffle(digits)
+    for num in digits:
+        masks.place(row, col, box, num)
+        found = _randomized_constrained_search(masks, stats, rng, limit, control, probe, depth + 1)
+        if found:
+            return True
+        masks.undo(row, col, box, num)
+        if found is None:
+            return None
+        stats['backtracks'] += 1
+    return False
+
+""" Перебор с ограничениями со случайными перезапусками: каждый запуск ограничен очередным бюджетом
+    из budgets, поле после оборванного запуска возвращается к исходному. Число перезапусков - в stats['restarts'] """
+def constrained_restart_solve(board: List[List[int]], stats: dict, rng: random.Random, budgets: Iterator[int],
+                              control: Optional[SolveControl] = None, probe: Optional[SolverProbe] = None) -> bool:
+    stats.setdefault('restarts', 0)
+    masks = CandidateMasks(board)
+    for budget in budgets:
+        found = _randomized_constrained_search(masks, stats, rng, stats['iterations'] + budget, control, probe)
+        if found is not None:
+            return found
+        stats['restarts'] += 1
+    return False
+
+""" Общая часть запусков с перезапусками: solve(stats, rng, budgets, control) -> решение или None """
+def _run_with_restarts(name: str, solve, control: Optional[SolveControl], probe: Optional[SolverProbe],
+                       schedule: str, seed: int) -> dict:
+    stats = {'iterations': 0, 'backtracks': 0, 'restarts': 0}
+    rng = random.Random(seed)
+    budgets = restart_budgets(schedule)
+    solution = None
+
+    def attempt() -> bool:
+        nonlocal solution
+        solution = solve(stats, rng, budgets, control)
+        return solution is not None
+
+    start_time = time.perf_counter()
+    if probe is not None:
+        probe.begin()
+    solved, status = guarded_solve(attempt)
+    if probe is not None:
+        probe.end()
+    elapsed = time.perf_counter() - start_time
+    result = {
+        'algorithm': name,
+        'solved': solved,
+        'status': status,
+        'time': elapsed,
+        'iterations': stats['iterations'],
+        'backtracks': stats['backtracks'],
+        'solution': solution,
+        'restarts': stats['restarts'],
+        'restart_schedule': schedule,
+        'seed': seed,
+    }
+    if probe is not None:
+        result['probe'] = probe.snapshot()
+    return result
+
+""" Запуск перебора с ограничениями со случайными перезапусками (воспроизводим по seed) """
+def run_constrained_restarts_algorithm(puzzle: Optional[List[List[int]]] = None,
+                                       control: Optional[SolveControl] = None, time_limit: Optional[float] = None,
+                                       max_iterations: Optional[int] = None, progress=None,
+                                       probe: Optional[SolverProbe] = None, schedule: str = 'geometric',
+                                       seed: int = 0) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]
+    control = make_solve_control(control, time_limit, max_iterations, progress)
+
+    def solve(stats: dict, rng: random.Random, budgets: Iterator[int], control: Optional[SolveControl]):
+        return puzzle if constrained_restart_solve(puzzle, stats, rng, budgets, control, probe) else None
+
+    return _run_with_restarts('Перебор с ограничениями (перезапуски)', solve, control, probe, schedule, seed)
+
+""" Запуск Dancing Links со случайными перезапусками: случайный порядок строк и выбор среди равных столбцов """
+def run_dancing_links_restarts_algorithm(puzzle: Optional[List[List[int]]] = None,
+                                         control: Optional[SolveControl] = None, time_limit: Optional[float] = None,
+                                         max_iterations: Optional[int] = None, progress=None,
+                                         probe: Optional[SolverProbe] = None, schedule: str = 'geometric',
+                                         seed: int = 0) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]
+    control = make_solve_control(control, time_limit, max_iterations, progress)
+
+    def solve(stats: dict, rng: random.Random, budgets: Iterator[int], control: Optional[SolveControl]):
+        solver = DancingLinksSolver(puzzle, strategy='random')
+        if solver.solve_with_restarts(stats, rng, budgets, control, probe):
+            return solver.get_solution_board()
+        return None
+
+    return _run_with_restarts('Dancing Links (перезапуски)', solve, control, probe, schedule, seed)
+
+
+
+# Проверка единственности решения
+""" Первая клетка, противоречащая уже просмотренным исходным цифрам, за один проход по полю """
+def find_given_conflict(puzzle: List[List[int]]) -> Optional[Tuple[int, int]]:
+    geometry = get_geometry(len(puzzle))
+    side = geometry.side
+    row_masks = [0] * side
+    col_masks = [0] * side
+    box_masks = [0] * side
+    for row in range(side):
+        if len(puzzle[row]) != side:
+            return (row, min(len(puzzle[row]), side - 1))
+        for col in range(side):
+            num = puzzle[row][col]
+            if num == 0:
+                continue
+            if not 1 <= num <= side:
+                return (row, col)
+            bit = 1 << (num - 1)
+            box = geometry.box_of[row * side + col]
+            if (row_masks[row] | col_masks[col] | box_masks[box]) & bit:
+                return (row, col)
+            row_masks[row] |= bit
+            col_masks[col] |= bit
+            box_masks[box] |= bit
+    return None
+
+""" Число решений, но не больше limit: поиск останавливается, как только limit достигнут """
+def count_solutions(puzzle: List[List[int]], limit: int = 2, algorithm: str = 'dlx',
+                    stats: Optional[dict] = None) -> int:
+    if stats is None:
+        stats = {'iterations': 0, 'backtracks': 0}
+    if find_given_conflict(puzzle) is not None:
+        return 0
+    count = 0
+    if algorithm == 'dlx':
+        solver = get_template_solver(len(puzzle))
+        if solver.load_puzzle(puzzle):
+            try:
+                for _ in solver.iter_solutions(stats):
+                    count += 1
+                    if count >= limit:
+                        break
+            finally:
+                solver.unload_puzzle()
+    else:
+        for _ in iter_constrained_solutions([row[:] for row in puzzle], stats):
+            count += 1
+            if count >= limit:
+                break
+    return count
+
+""" Головоломка имеет ровно одно решение """
+def has_unique_solution(puzzle: List[List[int]], algorithm: str = 'dlx') -> bool:
+    return count_solutions(puzzle, 2, algorithm) == 1
+
+
+
+# Подсказки
+""" Сессия подсказок для интерактивной игры. Маски кандидатов обновляются на каждом ходе, а найденное
+    решение переиспользуется, пока с ним согласны все заполненные клетки (счетчик mismatches).
+    Решение ищется заново, только если игрок отошел от него; известная тупиковая позиция запоминается
+    до отката хода, который к ней привел """
+class HintSession:
+
+    def __init__(self, puzzle: List[List[int]]):
+        conflict = find_given_conflict(puzzle)
+        if conflict is not None:
+            raise ValueError(f"исходные цифры противоречат друг другу в клетке {conflict}")
+        self.masks = CandidateMasks([row[:] for row in puzzle])
+        self.geometry = self.masks.geometry
+        self.givens = {(row, col) for row in range(len(puzzle)) for col in range(len(puzzle)) if puzzle[row][col]}
+        self.moves = []
+        self.solution = None
+        self.mismatches = 0
+        self.dead_depth = None
+        self.stats = {'iterations': 0, 'backtracks': 0, 'solves': 0}
+
+    @property
+    def board(self) -> List[List[int]]:
+        return self.masks.board
+
+    """ Ход не нарушает правил: клетка пуста и цифры нет в её строке, столбце и блоке """
+    def is_move_consistent(self, row: int, col: int, num: int) -> bool:
+        if self.board[row][col] != 0 or not 1 <= num <= self.geometry.side:
+            return False
+        box = self.geometry.box_of[row * self.geometry.side + col]
+        return bool(self.masks.candidates_mask(row, col, box) >> (num - 1) & 1)
+
+    """ Ход игрока. Ходы против правил не принимаются (ValueError) """
+    def place(self, row: int, col: int, num: int):
+        if not self.is_move_consistent(row, col, num):
+            raise ValueError(f"ход {num} в клетку ({row}, {col}) нарушает правила")
+        self.masks.place(row, col, self.geometry.box_of[row * self.geometry.side + col], num)
+        self.moves.append((row, col, num))
+        if self.solution is not None and self.solution[row][col] != num:
+            self.mismatches += 1
+
+    """ Отмена последнего хода, возвращает его (row, col, num) или None """
+    def undo(self) -> Optional[Tuple[int, int, int]]:
+        if not self.moves:
+            return None
+        row, col, num = self.moves.pop()
+        self.masks.undo(row, col, self.geometry.box_of[row * self.geometry.side + col], num)
+        if self.solution is not None and self.solution[row][col] != num:
+            self.mismatches -= 1
+        if self.dead_depth is not None and len(self.moves) < self.dead_depth:
+            self.dead_depth = None
+        return row, col, num
+
+    """ Поиск решения текущей доски (только если сохраненное решение ей противоречит) """
+    def _refresh_solution(self) -> bool:
+        if self.solution is not None and self.mismatches == 0:
+            return True
+        if self.dead_depth is not None:
+            return False
+        if self.masks.most_constrained_cell() is None and any(0 in row for row in self.board):
+            self.dead_depth = len(self.moves)
+            return False
+        self.stats['solves'] += 1
+        solution = get_template_solver(self.geometry.side).solve_puzzle(self.board, self.stats)
+        if solution is None:
+            self.dead_depth = len(self.moves)
+            return False
+        self.solution = solution
+        self.mismatches = 0
+        return True
+
+    """ Доску еще можно решить """
+    def is_solvable(self) -> bool:
+        return self._refresh_solution()
+
+    """ Ход ведет к решению: совпадает с сохраненным решением или доска с ним остается решаемой """
+    def leads_to_solution(self, row: int, col: int, num: int) -> bool:
+        if not self.is_move_consistent(row, col, num):
+            return False
+        if self._refresh_solution() and self.solution[row][col] == num:
+            return True
+        self.place(row, col, num)
+        try:
+            return self._refresh_solution()
+        finally:
+            self.undo()
+
+    """ Клетка, значение которой следует из правил: одиночка или скрытая одиночка.
+        Возвращает (row, col, num, правило) или None """
+    def next_forced_cell(self) -> Optional[Tuple[int, int, int, str]]:
+        masks = self.masks
+        board = masks.board
+        geometry = self.geometry
+        side = geometry.side
+        for row, col, box in masks.empty_cells:
+            if board[row][col] == 0:
+                mask = masks.candidates_mask(row, col, box)
+                if mask and mask & (mask - 1) == 0:
+                    return row, col, mask.bit_length(), 'naked_single'
+        for unit in geometry.all_units:
+            once = twice = 0
+            for index in unit:
+                row, col = divmod(index, side)
+                if board[row][col] == 0:
+                    mask = masks.candidates_mask(row, col, geometry.box_of[index])
+                    twice |= once & mask
+                    once |= mask
+            unique = once & ~twice
+            if not unique:
+                continue
+            for index in unit:
+                row, col = divmod(index, side)
+                if board[row][col] == 0:
+                    mask = masks.candidates_mask(row, col, geometry.box_of[index]) & unique
+                    if mask:
+                        return row, col, (mask & -mask).bit_length(), 'hidden_single'
+        return None
+
+    """ Подсказка: вынужденная клетка, а если её нет - значение из решения для клетки с минимумом
+        кандидатов. None - доска решена или решений нет """
+    def hint(self) -> Optional[Tuple[int, int, int, str]]:
+        if not self._refresh_solution():
+            return None
+        forced = self.next_forced_cell()
+        if forced is not None:
+            return forced
+        cell = self.masks.most_constrained_cell()
+        if cell is None:
+            return None
+        row, col = cell[0], cell[1]
+        return row, col, self.solution[row][col], 'solution'
 
 
 
 # Распараллеливание алгоритмов
-""" Запуск всех алгоритмов параллельно """
-def parallel_solve_algorithms() -> dict:
-    algorithms = [
-        ('Наивный перебор', run_naive_algorithm),
-        ('Перебор с ограничениями', run_constrained_algorithm),
-        ('Dancing Links', run_dancing_links_algorithm),
-    ]
+""" Алгоритмы, участвующие в гонке """
+PORTFOLIO_ALGORITHMS = [
+    run_naive_algorithm,
+    run_constrained_algorithm,
+    run_propagation_algorithm,
+    run_dancing_links_algorithm,
+    run_bitboard_algorithm,
+]
+
+""" Сколько ждать остановки проигравших процессов, прежде чем завершить их принудительно """
+PORTFOLIO_STOP_TIMEOUT = 0.5
+
+""" Процесс-участник гонки: результат (в том числе частичный) в очередь """
+def _portfolio_worker(func, puzzle: Optional[List[List[int]]], cancel_event, results,
+                      time_limit: Optional[float], max_iterations: Optional[int]):
+    results.put(func(puzzle, SolveControl(cancel_event, time_limit, max_iterations)))
+
+""" Запуск всех алгоритмов параллельно в отдельных процессах; после первого окончательного ответа
+    (решение или доказанное отсутствие решения - все участники полные) остальные отменяются.
+    time_limit - общий лимит времени гонки, max_iterations - лимит узлов для каждого алгоритма """
+def parallel_solve_algorithms(puzzle: Optional[List[List[int]]] = None, algorithms: Optional[list] = None,
+                              time_limit: Optional[float] = None, max_iterations: Optional[int] = None) -> dict:
+    algorithms = algorithms or PORTFOLIO_ALGORITHMS
+    cancel_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
     start_time = time.perf_counter()  
-    with ThreadPoolExecutor(max_workers=len(algorithms)) as executor:
-        futures = {executor.submit(func): name for name, func in algorithms}
-        for future in as_completed(futures):
-            result = future.result()  
-            if result['solved']:  
-                elapsed = time.perf_counter() - start_time  
-                result['time'] = elapsed  
-                result['algorithm'] = f"Параллельный ({result['algorithm']})"  
-                return result  
+    deadline = start_time + time_limit if time_limit is not None else None
+    processes = [
+        multiprocessing.Process(target=_portfolio_worker, daemon=True,
+                                args=(func, puzzle, cancel_event, results, time_limit, max_iterations))
+        for func in algorithms
+    ]
+    for process in processes:
+        process.start()
+    winner = None
+    finished = []
+    while len(finished) < len(processes) and winner is None:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        try:
+            result = results.get(timeout=0.05)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes) and results.empty():
+                break
+            continue
+        finished.append(result)
+        if result['status'] in (STATUS_SOLVED, STATUS_UNSOLVABLE):
+            winner = result
     elapsed = time.perf_counter() - start_time
+    cancel_event.set()
+    for process in processes:
+        process.join(PORTFOLIO_STOP_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    if winner is not None:
+        winner['time'] = elapsed
+        winner['algorithm'] = f"Параллельный ({winner['algorithm']})"
+        return winner
+    # добираем частичные результаты остановленных участников
+    while True:
+        try:
+            finished.append(results.get(timeout=0.05))
+        except queue.Empty:
+            break
+    # без победителя ответа нет: доказанное отсутствие решения само стало бы победителем,
+    # а остановленные участники вернули timed_out или cancelled
     return {
         'algorithm': 'Параллельный (все алгоритмы)',
         'solved': False,
+        'status': STATUS_TIMED_OUT,
         'time': elapsed,
-        'iterations': 0,
-        'backtracks': 0,
+        'iterations': sum(r['iterations'] for r in finished),
+        'backtracks': sum(r['backtracks'] for r in finished),
         'solution': None
     }
 
 
 
+# Разбиение дерева поиска одной головоломки
+""" Флаг отмены в процессах-обработчиках (задается инициализатором пула) """
+_SPLIT_CANCEL_EVENT = None
+
+def _init_split_worker(cancel_event):
+    global _SPLIT_CANCEL_EVENT
+    _SPLIT_CANCEL_EVENT = cancel_event
+
+""" Подзадача Dancing Links: поиск в поддереве префикса на готовой матрице процесса """
+def _solve_dlx_subproblem(puzzle: List[List[int]], prefix: List[int]) -> dict:
+    stats = {'iterations': 0, 'backtracks': 0}
+    solver = get_template_solver(len(puzzle))
+    solver.load_puzzle(puzzle)
+    try:
+        solver.start_search(stats, SolveControl(_SPLIT_CANCEL_EVENT), prefix)
+        if solver.step():
+            return {'solved': True, 'solution': solver.get_solution_board(), 'stats': stats}
+    except SolveCancelled:
+        pass
+    finally:
+        solver.unload_puzzle()
+    return {'solved': False, 'solution': None, 'stats': stats}
+
+""" Развертка дерева Dancing Links на готовой матрице """
+def _expand_dlx(puzzle: List[List[int]], min_tasks: int, stats: dict) -> Tuple[Optional[List[List[int]]], list]:
+    solver = get_template_solver(len(puzzle))
+    if not solver.load_puzzle(puzzle):
+        solver.unload_puzzle()
+        return None, []
+    try:
+        solution, prefixes = solver.expand_subproblems(min_tasks, stats)
+        if solution is not None:
+            solver.push_frames(solution)
+            solver.solution_rows = [solver.row_of[row] for row in solution]
+            return solver.get_solution_board(), []
+        return None, prefixes
+    finally:
+        solver.unload_puzzle()
+
+""" Подзадача перебора с ограничениями: префикс - список ходов (строка, столбец, цифра) """
+def _solve_constrained_subproblem(puzzle: List[List[int]], prefix: List[Tuple[int, int, int]]) -> dict:
+    stats = {'iterations': 0, 'backtracks': 0}
+    board = [row[:] for row in puzzle]
+    for row, col, num in prefix:
+        board[row][col] = num
+    try:
+        if constrained_backtrack_solve(board, stats, SolveControl(_SPLIT_CANCEL_EVENT)):
+            return {'solved': True, 'solution': board, 'stats': stats}
+    except SolveCancelled:
+        pass
+    return {'solved': False, 'solution': None, 'stats': stats}
+
+""" Развертка дерева перебора с ограничениями в ширину до min_tasks подзадач """
+def _expand_constrained(puzzle: List[List[int]], min_tasks: int, stats: dict,
+                        max_depth: int = 8) -> Tuple[Optional[List[List[int]]], list]:
+    frontier = [[]]
+    depth = 0
+    while frontier and len(frontier) < min_tasks and depth < max_depth:
+        next_frontier = []
+        for prefix in frontier:
+            board = [row[:] for row in puzzle]
+            for row, col, num in prefix:
+                board[row][col] = num
+            masks = CandidateMasks(board)
+            stats['iterations'] += 1
+            cell_info = masks.most_constrained_cell()
+            if not cell_info:
+                if all(board[row][col] for row, col, _ in masks.empty_cells):
+                    return board, []
+                stats['backtracks'] += 1
+                continue
+            row, col, _, mask = cell_info
+            for num in mask_to_digits(mask):
+                next_frontier.append(prefix + [(row, col, num)])
+        frontier = next_frontier
+        depth += 1
+    return None, frontier
+
+""" Способы разбиения: (развертка, подзадача, название) """
+SPLIT_ALGORITHMS = {
+    'dlx': (_expand_dlx, _solve_dlx_subproblem, 'Dancing Links'),
+    'constrained': (_expand_constrained, _solve_constrained_subproblem, 'Перебор с ограничениями'),
+}
+
+""" Решение одной трудной головоломки на пуле процессов: первые уровни дерева разворачиваются в подзадачи
+    (с запасом tasks_per_worker на процесс, чтобы освободившиеся процессы забирали оставшиеся задачи
+    из общей очереди), первое найденное решение отменяет остальные. Счетчики суммируются. """
+def split_solve(puzzle: Optional[List[List[int]]] = None, algorithm: str = 'dlx', workers: Optional[int] = None,
+                tasks_per_worker: int = 8) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]
+    expand, solve_subproblem, name = SPLIT_ALGORITHMS[algorithm]
+    workers = workers or multiprocessing.cpu_count()
+    stats = {'iterations': 0, 'backtracks': 0}
+    start_time = time.perf_counter()
+    solution, prefixes = expand(puzzle, workers * tasks_per_worker, stats)
+    if solution is None and prefixes:
+        cancel_event = multiprocessing.Event()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_split_worker,
+                                 initargs=(cancel_event,)) as executor:
+            futures = [executor.submit(solve_subproblem, puzzle, prefix) for prefix in prefixes]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                result = future.result()
+                stats['iterations'] += result['stats']['iterations']
+                stats['backtracks'] += result['stats']['backtracks']
+                if result['solved'] and solution is None:
+                    solution = result['solution']
+                    cancel_event.set()
+                    for other in futures:
+                        other.cancel()
+    elapsed = time.perf_counter() - start_time
+    return {
+        'algorithm': f"Разбиение дерева ({name}, процессов: {workers})",
+        'solved': solution is not None,
+        # подзадачи отменяются только после найденного решения, поэтому без него ответ окончательный
+        'status': STATUS_SOLVED if solution is not None else STATUS_UNSOLVABLE,
+        'time': elapsed,
+        'iterations': stats['iterations'],
+        'backtracks': stats['backtracks'],
+        'subproblems': len(prefixes),
+        'solution': solution
+    }
+
+
+
+# Векторизованное пакетное решение (NumPy)
+""" Таблицы индексов для поля side x side: соседи клеток, клетки групп, место клетки в её трех группах
+    и пересечения блок/линия (клетки пересечения, остатков блока и линии; для каждой клетки - пересечения,
+    в остаток линии и в остаток блока которых она входит) """
+_NUMPY_TABLES = {}
+
+""" Таблицы индексов NumPy (строятся один раз на размер поля) """
+def _numpy_tables(side: int) -> tuple:
+    tables = _NUMPY_TABLES.get(side)
+    if tables is None:
+        geometry = get_geometry(side)
+        unit_of = [[] for _ in range(geometry.cells)]
+        position_of = [[] for _ in range(geometry.cells)]
+        for unit_index, unit in enumerate(geometry.all_units):
+            for position, cell in enumerate(unit):
+                unit_of[cell].append(unit_index)
+                position_of[cell].append(position)
+        intersections = geometry.box_line_intersections
+        line_sources = [[] for _ in range(geometry.cells)]
+        box_sources = [[] for _ in range(geometry.cells)]
+        for index, (_, box_rest, line_rest) in enumerate(intersections):
+            for cell in line_rest:
+                line_sources[cell].append(index)
+            for cell in box_rest:
+                box_sources[cell].append(index)
+        tables = _NUMPY_TABLES[side] = (
+            np.array(geometry.peers, dtype=np.intp),
+            np.array(geometry.all_units, dtype=np.intp),
+            np.array(unit_of, dtype=np.intp),
+            np.array(position_of, dtype=np.intp),
+            np.array([inter for inter, _, _ in intersections], dtype=np.intp),
+            np.array([box_rest for _, box_rest, _ in intersections], dtype=np.intp),
+            np.array([line_rest for _, _, line_rest in intersections], dtype=np.intp),
+            np.array(line_sources, dtype=np.intp),
+            np.array(box_sources, dtype=np.intp),
+        )
+    return tables
+
+""" Пачка досок одного размера в массив (B, side^2) масок кандидатов: у исходной цифры - её бит, у пустой - все """
+def puzzles_to_masks(puzzles: List[List[List[int]]]) -> 'np.ndarray':
+    side = len(puzzles[0])
+    values = np.array(puzzles, dtype=np.int32).reshape(len(puzzles), side * side)
+    full_mask = (1 << side) - 1
+    return np.where(values > 0, np.left_shift(1, np.maximum(values - 1, 0)), full_mask).astype(np.int32)
+
+""" Маски в значения клеток: клетка с одним кандидатом получает его цифру, остальные - 0 """
+def masks_to_values(masks: 'np.ndarray') -> 'np.ndarray':
+    single = (masks != 0) & ((masks & (masks - 1)) == 0)
+    digits = np.log2(np.where(single, masks, 1)).astype(np.int32) + 1
+    return np.where(single, digits, 0)
+
+""" Распространение для всей пачки сразу: вычеркивание цифр соседей-одиночек, скрытые одиночки
+    и запертые кандидаты до неподвижной точки. Противоречивая головоломка получает нулевую маску.
+    Возвращает число проходов """
+def propagate_batch(masks: 'np.ndarray', side: int) -> int:
+    peers, units, unit_of, position_of, inters, box_rests, line_rests, line_sources, box_sources = \
+        _numpy_tables(side)
+    full_mask = (1 << side) - 1
+    active = np.arange(len(masks))
+    passes = 0
+    while active.size:
+        passes += 1
+        current = masks[active]
+        before = current.copy()
+        # Одиночки вычеркиваются у соседей (две одинаковые одиночки обнуляют друг друга)
+        singles = np.where((current & (current - 1)) == 0, current, 0)
+        current &= ~np.bitwise_or.reduce(singles[:, peers], axis=2)
+        # Скрытые одиночки: цифра, которая встречается в группе ровно в одной клетке
+        unit_masks = current[:, units]
+        once = np.zeros(unit_masks.shape[:2], dtype=current.dtype)
+        twice = np.zeros_like(once)
+        for position in range(side):
+            column = unit_masks[:, :, position]
+            twice |= once & column
+            once |= column
+        hidden = unit_masks & (once & ~twice)[:, :, None]
+        forced = np.bitwise_or.reduce(hidden[:, unit_of, position_of], axis=2)
+        conflicting = (forced & (forced - 1)) != 0
+        current = np.where(forced != 0, np.where(conflicting, 0, forced), current)
+        # Цифра, которой не осталось места в группе - противоречие
+        current[(once != full_mask).any(axis=1), 0] = 0
+        # Запертые кандидаты: цифра пересечения, которой нет в остатке блока, вычеркивается из остатка линии
+        # (pointing), и наоборот (claiming)
+        inter_mask = np.bitwise_or.reduce(current[:, inters], axis=2)
+        box_mask = np.bitwise_or.reduce(current[:, box_rests], axis=2)
+        line_mask = np.bitwise_or.reduce(current[:, line_rests], axis=2)
+        pointing = inter_mask & ~box_mask & line_mask
+        claiming = inter_mask & ~line_mask & box_mask
+        current &= ~(np.bitwise_or.reduce(pointing[:, line_sources], axis=2)
+                     | np.bitwise_or.reduce(claiming[:, box_sources], axis=2))
+        masks[active] = current
+        changed = (current != before).any(axis=1) & (current != 0).all(axis=1)
+        active = active[changed]
+    return passes
+
+""" Раундов пакетного ветвления и допустимый рост числа состояний (во сколько раз больше головоломок) """
+NUMPY_BRANCH_ROUNDS = 4
+NUMPY_BRANCH_GROWTH = 8
+
+""" Ветвление для всей пачки: в каждом состоянии берется клетка с минимумом кандидатов, каждая её цифра
+    дает потомка, и все потомки распространяются одним вызовом propagate_batch. Не больше rounds уровней
+    и growth * len(masks) потомков за уровень. Возвращает (маски найденного решения или None, доказано
+    ли отсутствие решения, число потомков и тупиков) по каждой головоломке; остальные не разрешены """
+def branch_batch(masks: 'np.ndarray', side: int, rounds: int = NUMPY_BRANCH_ROUNDS,
+                 growth: int = NUMPY_BRANCH_GROWTH) -> Tuple[list, 'np.ndarray', 'np.ndarray', 'np.ndarray']:
+    count = len(masks)
+    solutions = [None] * count
+    refuted = np.zeros(count, dtype=bool)
+    nodes = np.zeros(count, dtype=np.int64)
+    dead = np.zeros(count, dtype=np.int64)
+    states, owners = masks, np.arange(count)
+    for _ in range(rounds):
+        if not len(states):
+            break
+        sizes = sum((states >> bit) & 1 for bit in range(side))
+        cell = np.where(sizes > 1, sizes, side + 1).argmin(axis=1)
+        chosen = states[np.arange(len(states)), cell]
+        children, child_owners = [], []
+        for bit in range(side):
+            has = ((chosen >> bit) & 1) == 1
+            if has.any():
+                child = states[has]
+                child[np.arange(len(child)), cell[has]] = 1 << bit
+                children.append(child)
+                child_owners.append(owners[has])
+        children, child_owners = np.concatenate(children), np.concatenate(child_owners)
+        if len(children) > growth * count:
+            break
+        propagate_batch(children, side)
+        np.add.at(nodes, child_owners, 1)
+        contradicted = (children == 0).any(axis=1)
+        np.add.at(dead, child_owners[contradicted], 1)
+        complete = ~contradicted & ((children & (children - 1)) == 0).all(axis=1)
+        for k in np.flatnonzero(complete):
+            if solutions[child_owners[k]] is None:
+                solutions[child_owners[k]] = children[k]
+        found = np.array([solution is not None for solution in solutions])
+        keep = ~contradicted & ~complete & ~found[child_owners]
+        # все ветви головоломки зашли в тупик - решения нет
+        live = np.zeros(count, dtype=bool)
+        live[child_owners[keep]] = True
+        branched = np.zeros(count, dtype=bool)
+        branched[owners] = True
+        refuted |= branched & ~live & ~found
+        states, owners = children[keep], child_owners[keep]
+    return solutions, refuted, nodes, dead
+
+""" Перебор с распространением для головоломки, которую пакетное распространение не решило: поиск
+    начинается с уже вычисленных масок (одиночки - поставленные цифры), а не с исходного поля """
+def _finish_numpy_puzzle(masks: 'np.ndarray', values: 'np.ndarray', side: int,
+                         control: Optional[SolveControl]) -> dict:
+    cells = values.tolist()
+    cands = np.where(values > 0, 0, masks).tolist()
+    stats = {'iterations': 0, 'backtracks': 0}
+    for key in PROPAGATION_RULES:
+        stats[key] = 0
+    solution = None
+    start_time = time.perf_counter()
+
+    def search() -> bool:
+        nonlocal solution
+        found = _propagated_search(cells, cands, stats, control, get_geometry(side))
+        if found is not None:
+            solution = [found[row * side:(row + 1) * side] for row in range(side)]
+        return found is not None
+
+    solved, status = guarded_solve(search)
+    return {
+        'algorithm': 'NumPy (пакетное распространение)',
+        'solved': solved,
+        'status': status,
+        'time': time.perf_counter() - start_time,
+        'iterations': stats['iterations'],
+        'backtracks': stats['backtracks'],
+        'solution': solution
+    }
+
+""" Решение пачки головоломок: общее векторизованное распространение и несколько уровней пакетного
+    ветвления, затем перебор с распространением (с вычисленных масок) только для неразрешенных.
+    Время пакетной части делится поровну между головоломками пачки """
+def solve_puzzles_numpy(puzzles: List[List[List[int]]], control: Optional[SolveControl] = None,
+                        time_limit: Optional[float] = None, max_iterations: Optional[int] = None) -> List[dict]:
+    if np is None:
+        raise ImportError("для пакетного решателя нужен numpy")
+    results = [None] * len(puzzles)
+    by_side = {}
+    for index, puzzle in enumerate(puzzles):
+        by_side.setdefault(len(puzzle), []).append(index)
+    for side, indices in by_side.items():
+        start_time = time.perf_counter()
+        masks = puzzles_to_masks([puzzles[i] for i in indices])
+        propagate_batch(masks, side)
+        contradicted = (masks == 0).any(axis=1)
+        solved = ~contradicted & ((masks & (masks - 1)) == 0).all(axis=1)
+        solutions = [masks[k] if solved[k] else None for k in range(len(indices))]
+        nodes = np.zeros(len(indices), dtype=np.int64)
+        dead = np.zeros(len(indices), dtype=np.int64)
+        pending = np.flatnonzero(~contradicted & ~solved)
+        if pending.size:
+            branch_solutions, refuted, nodes[pending], dead[pending] = branch_batch(masks[pending], side)
+            contradicted[pending] = refuted
+            for k, solution in zip(pending, branch_solutions):
+                solutions[k] = solution
+        shared_time = (time.perf_counter() - start_time) / len(indices)
+        for k, index in enumerate(indices):
+            if contradicted[k] or solutions[k] is not None:
+                solution = solutions[k]
+                if solution is not None:
+                    solution = masks_to_values(solution).reshape(side, side).tolist()
+                result = {
+                    'algorithm': 'NumPy (пакетное распространение)',
+                    'solved': solution is not None,
+                    'status': STATUS_SOLVED if solution is not None else STATUS_UNSOLVABLE,
+                    'time': 0.0,
+                    'iterations': int(nodes[k]),
+                    'backtracks': int(dead[k]),
+                    'solution': solution
+                }
+            else:
+                puzzle_control = make_solve_control(control, time_limit, max_iterations)
+                result = _finish_numpy_puzzle(masks[k], masks_to_values(masks[k]), side, puzzle_control)
+                result['iterations'] += int(nodes[k])
+                result['backtracks'] += int(dead[k])
+            result['time'] += shared_time
+            results[index] = result
+    return results
+
+""" Запуск пакетного решателя на одной головоломке (для единообразия с остальными алгоритмами) """
+def run_numpy_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                        time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                        progress=None) -> dict:
+    puzzle = [row[:] for row in (puzzle or ORIGINAL_PUZZLE)]
+    control = make_solve_control(control, time_limit, max_iterations, progress)
+    return solve_puzzles_numpy([puzzle], control)[0]
+
+
+
+# Пакетное решение
+""" Dancing Links на общей для процесса готовой матрице """
+def run_template_dancing_links_algorithm(puzzle: Optional[List[List[int]]] = None,
+                                         control: Optional[SolveControl] = None,
+                                         time_limit: Optional[float] = None,
+                                         max_iterations: Optional[int] = None, progress=None,
+                                         probe: Optional[SolverProbe] = None) -> dict:
+    return run_dancing_links_algorithm(puzzle, control, True, time_limit, max_iterations, progress, probe)
+
+""" Решатели по короткому имени (для пакетного режима и командной строки) """
+SOLVERS = {
+    'naive': run_naive_algorithm,
+    'naive-fast': run_naive_fast_algorithm,
+    'constrained': run_constrained_algorithm,
+    'propagation': run_propagation_algorithm,
+    'dlx': run_dancing_links_algorithm,
+    'dlx-template': run_template_dancing_links_algorithm,
+    'bitboard': run_bitboard_algorithm,
+    'constrained-restarts': run_constrained_restarts_algorithm,
+    'dlx-restarts': run_dancing_links_restarts_algorithm,
+}
+if np is not None:
+    SOLVERS['numpy'] = run_numpy_algorithm
+
+""" Решатели, которые обрабатывают пачку головоломок целиком """
+BATCH_SOLVERS = {'numpy': solve_puzzles_numpy}
+
+""" Головоломка из строки в side^2 символов (81 для 9x9, 256 для 16x16, ...), пустые клетки - '0' или '.' """
+def parse_puzzle_line(line: str) -> List[List[int]]:
+    line = line.strip()
+    side = math.isqrt(len(line))
+    if side * side != len(line) or math.isqrt(side) ** 2 != side or side < 4:
+        raise ValueError(f"длина строки {len(line)} не соответствует полю N^2 x N^2")
+    cells = [parse_cell_symbol(char) for char in line]
+    for value in cells:
+        if value > side:
+            raise ValueError(f"значение {value} не помещается в поле {side}x{side}")
+    return [cells[r * side:(r + 1) * side] for r in range(side)]
+
+""" Доска в строку из side^2 символов """
+def format_puzzle_line(board: List[List[int]]) -> str:
+    return ''.join(CELL_SYMBOLS[v] for row in board for v in row)
+
+""" Решение одной строки входного файла """
+def _solve_line(algorithm: str, index: int, line: str, limits: Optional[dict] = None,
+                cache: Optional['SolutionCache'] = None) -> dict:
+    record = {'index': index, 'puzzle': line}
+    try:
+        puzzle = parse_puzzle_line(line)
+    except ValueError as error:
+        record.update({'solved': False, 'error': str(error)})
+        return record
+    if cache is not None:
+        return _fill_record(record, cache.solve(puzzle, algorithm, **(limits or {})))
+    return _fill_record(record, SOLVERS[algorithm](puzzle, **(limits or {})))
+
+""" Поля результата решателя в записи вывода """
+def _fill_record(record: dict, result: dict) -> dict:
+    record.update({
+        'solved': result['solved'],
+        'status': result['status'],
+        'solution': format_puzzle_line(result['solution']) if result['solved'] else None,
+        'time': result['time'],
+        'iterations': result['iterations'],
+        'backtracks': result['backtracks'],
+    })
+    if 'restarts' in result:
+        record['restarts'] = result['restarts']
+    return record
+
+""" Решение пачки строк пакетным решателем: все разобранные головоломки передаются одним вызовом """
+def _solve_chunk_batch(algorithm: str, chunk: List[Tuple[int, str]], limits: Optional[dict] = None) -> List[dict]:
+    records = []
+    puzzles = []
+    for index, line in chunk:
+        record = {'index': index, 'puzzle': line}
+        try:
+            puzzles.append((record, parse_puzzle_line(line)))
+        except ValueError as error:
+            record.update({'solved': False, 'error': str(error)})
+        records.append(record)
+    if puzzles:
+        results = BATCH_SOLVERS[algorithm]([puzzle for _, puzzle in puzzles], **(limits or {}))
+        for (record, _), result in zip(puzzles, results):
+            _fill_record(record, result)
+    return records
+
+""" Решение пачки строк в процессе-обработчике. cache - параметры get_solution_cache (пакетные решатели
+    кэш не используют) """
+def _solve_chunk(algorithm: str, chunk: List[Tuple[int, str]], limits: Optional[dict] = None,
+                 cache: Optional[dict] = None) -> List[dict]:
+    if algorithm in BATCH_SOLVERS:
+        return _solve_chunk_batch(algorithm, chunk, limits)
+    solution_cache = get_solution_cache(**cache) if cache is not None else None
+    return [_solve_line(algorithm, index, line, limits, solution_cache) for index, line in chunk]
+
+""" Разбиение потока строк на пачки (пустые строки и комментарии '#' пропускаются) """
+def _read_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    chunk = []
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        chunk.append((index, line))
+        index += 1
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+""" Потоковое решение множества головоломок. В работе одновременно не больше 2 * workers пачек,
+    поэтому память не зависит от размера входа. ordered=False - результаты в порядке готовности.
+    time_limit и max_iterations ограничивают каждую головоломку (статус 'timed_out').
+    cache - параметры кэша решений {'max_bytes': ..., 'path': ...}, кэш свой в каждом процессе """
+def solve_many(lines: Iterable[str], algorithm: str = 'dlx-template', workers: Optional[int] = None,
+               chunk_size: int = 256, ordered: bool = True, time_limit: Optional[float] = None,
+               max_iterations: Optional[int] = None, cache: Optional[dict] = None) -> Iterator[dict]:
+    if algorithm not in SOLVERS:
+        raise ValueError(f"неизвестный алгоритм {algorithm!r}")
+    limits = {'time_limit': time_limit, 'max_iterations': max_iterations}
+    tasks = ((algorithm, chunk, limits, cache) for chunk in _read_chunks(lines, chunk_size))
+    yield from _run_chunk_tasks(_solve_chunk, tasks, workers, ordered)
+
+""" Выполнение задач-пачек func(*task) в пуле процессов (или в текущем процессе при workers == 1)
+    не больше чем с 2 * workers задачами в работе """
+def _run_chunk_tasks(func, tasks: Iterable[tuple], workers: Optional[int], ordered: bool) -> Iterator[dict]:
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1:
+        for task in tasks:
+            yield from func(*task)
+        return
+    max_in_flight = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(func, *task))
+            if len(pending) < max_in_flight:
+                continue
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+        if ordered:
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+
+""" Строка вывода: номер, решение, итерации, откаты, время в мс (через табуляцию) """
+def format_result_line(record: dict) -> str:
+    if 'error' in record:
+        return f"{record['index']}\tERROR\t{record['error']}"
+    solution = record['solution'] or ('TIMEOUT' if record['status'] == STATUS_TIMED_OUT else '-')
+    return (f"{record['index']}\t{solution}\t{record['iterations']}\t"
+            f"{record['backtracks']}\t{record['time'] * 1000:.3f}")
+
+
+
+# Кэш решений с учетом симметрий
+""" Предел перебора порядков строк и столбцов с равными инвариантами (на одну ориентацию поля) """
+CANONICAL_MAX_ORDERS = 64
+
+""" Оценка накладных расходов на запись кэша сверх размеров строк ключа и решения, байт """
+CACHE_ENTRY_OVERHEAD = 120
+
+""" Значение кэша для головоломки без решения """
+CACHE_UNSOLVABLE = '-'
+
+""" Транспонированная доска """
+def _transpose(board: List[List[int]]) -> List[List[int]]:
+    return [list(column) for column in zip(*board)]
+
+""" Порядки items по возрастанию key, в которых элементы с равным ключом переставляются всеми способами """
+def _tie_orders(items: Iterable[int], key, limit: int) -> List[List[int]]:
+    runs = [list(run) for _, run in itertools.groupby(sorted(items, key=key), key=key)]
+    choices = itertools.product(*[itertools.permutations(run) for run in runs])
+    return [[item for run in choice for item in run] for choice in itertools.islice(choices, limit)]
+
+""" Порядки строк доски: полосы и строки внутри полос упорядочены по инвариантам, которые не меняются
+    при перестановках строк, столбцов и переименовании цифр (число подсказок в строке и заполненность
+    столбцов, в которых они стоят) """
+def _line_orders(board: List[List[int]], box: int, limit: int) -> List[List[int]]:
+    side = len(board)
+    column_counts = [sum(1 for row in board if row[c]) for c in range(side)]
+    row_keys = [sorted(column_counts[c] for c in range(side) if board[r][c]) for r in range(side)]
+    row_keys = [(len(key), key) for key in row_keys]
+    band_keys = [sorted(row_keys[r] for r in range(b * box, (b + 1) * box)) for b in range(box)]
+    orders = []
+    for band_order in _tie_orders(range(box), band_keys.__getitem__, limit):
+        inner = [_tie_orders(range(b * box, (b + 1) * box), row_keys.__getitem__, limit) for b in band_order]
+        for choice in itertools.islice(itertools.product(*inner), limit - len(orders)):
+            orders.append([row for rows in choice for row in rows])
+        if len(orders) >= limit:
+            break
+    return orders
+
+""" Каноническая форма головоломки относительно транспонирования, перестановок полос, строк в полосах,
+    стеков, столбцов в стеках и переименования цифр: минимальная строка по перебираемым порядкам.
+    Возвращает (ключ, преобразование), преобразование - (транспонирована, порядок строк, порядок столбцов,
+    отображение цифр). При большом числе равноправных порядков перебор обрезается max_orders, тогда
+    эквивалентные головоломки могут получить разные ключи, но ключ всегда соответствует своей головоломке """
+def canonical_form(board: List[List[int]], max_orders: int = CANONICAL_MAX_ORDERS) -> Tuple[str, tuple]:
+    geometry = get_geometry(len(board))
+    side = geometry.side
+    best_key = None
+    best_transform = None
+    for transposed in (False, True):
+        source = _transpose(board) if transposed else board
+        row_orders = _line_orders(source, geometry.box, max_orders)
+        col_orders = _line_orders(_transpose(source), geometry.box, max_orders)
+        for row_order, col_order in itertools.islice(itertools.product(row_orders, col_orders), max_orders):
+            digit_map = [0] * (side + 1)
+            next_digit = 1
+            chars = []
+            for r in row_order:
+                source_row = source[r]
+                for c in col_order:
+                    value = source_row[c]
+                    if value and not digit_map[value]:
+                        digit_map[value] = next_digit
+                        next_digit += 1
+                    chars.append(CELL_SYMBOLS[digit_map[value]])
+            key = ''.join(chars)
+            if best_key is None or key < best_key:
+                for value in range(1, side + 1):
+                    if not digit_map[value]:
+                        digit_map[value] = next_digit
+                        next_digit += 1
+                best_key = key
+                best_transform = (transposed, row_order, col_order, digit_map)
+    return best_key, best_transform
+
+""" Доска в ориентации канонической формы """
+def to_canonical(board: List[List[int]], transform: tuple) -> List[List[int]]:
+    transposed, row_order, col_order, digit_map = transform
+    source = _transpose(board) if transposed else board
+    return [[digit_map[source[r][c]] for c in col_order] for r in row_order]
+
+""" Доска из канонической ориентации обратно в ориентацию исходной головоломки """
+def from_canonical(board: List[List[int]], transform: tuple) -> List[List[int]]:
+    transposed, row_order, col_order, digit_map = transform
+    inverse = [0] * len(digit_map)
+    for value, mapped in enumerate(digit_map):
+        inverse[mapped] = value
+    side = len(board)
+    source = [[0] * side for _ in range(side)]
+    for i, r in enumerate(row_order):
+        for j, c in enumerate(col_order):
+            source[r][c] = inverse[board[i][j]]
+    return _transpose(source) if transposed else source
+
+""" Кэш решений по каноническому ключу головоломки: LRU в памяти с ограничением по объему и
+    необязательное общее для процессов хранилище sqlite (path). Решение хранится в канонической
+    ориентации и при выдаче переводится в ориентацию запроса """
+class SolutionCache:
+
+    def __init__(self, max_bytes: int = 64 << 20, path: Optional[str] = None,
+                 max_orders: int = CANONICAL_MAX_ORDERS):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.max_orders = max_orders
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+        self.connection = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    """ Соединение с хранилищем (открывается при первом обращении, в каждом процессе свое) """
+    def _database(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, timeout=30)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT NOT NULL)')
+            self.connection.commit()
+        return self.connection
+
+    """ Запись в памяти с вытеснением давно не использованных записей """
+    def _remember(self, key: str, value: str):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = value
+        self.used_bytes += sys.getsizeof(key) + sys.getsizeof(value) + CACHE_ENTRY_OVERHEAD
+        while self.used_bytes > self.max_bytes and self.entries:
+            old_key, old_value = self.entries.popitem(last=False)
+            self.used_bytes -= sys.getsizeof(old_key) + sys.getsizeof(old_value) + CACHE_ENTRY_OVERHEAD
+            self.evictions += 1
+
+    """ Значение по ключу: сначала память, затем хранилище. Возвращает (значение, откуда) """
+    def get(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            return value, 'memory'
+        database = self._database()
+        if database is not None:
+            row = database.execute('SELECT solution FROM solutions WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                return row[0], 'disk'
+        return None, None
+
+    """ Сохранение значения в памяти и в хранилище """
+    def put(self, key: str, value: str):
+        self._remember(key, value)
+        database = self._database()
+        if database is not None:
+            database.execute('INSERT OR IGNORE INTO solutions (key, solution) VALUES (?, ?)', (key, value))
+            database.commit()
+
+    """ Решение через кэш: при промахе головоломку решает SOLVERS[algorithm], окончательный результат
+        (решено или решений нет) сохраняется. Результат - словарь решателя с полем 'cache' """
+    def solve(self, puzzle: List[List[int]], algorithm: str = 'dlx-template', **limits) -> dict:
+        start_time = time.perf_counter()
+        key, transform = canonical_form(puzzle, self.max_orders)
+        value, source = self.get(key)
+        if value is not None:
+            if source == 'memory':
+                self.hits += 1
+            else:
+                self.disk_hits += 1
+            solved = value != CACHE_UNSOLVABLE
+            return {
+                'algorithm': 'Кэш решений',
+                'solved': solved,
+                'status': STATUS_SOLVED if solved else STATUS_UNSOLVABLE,
+                'time': time.perf_counter() - start_time,
+                'iterations': 0,
+                'backtracks': 0,
+                'solution': from_canonical(parse_puzzle_line(value), transform) if solved else None,
+                'cache': source
+            }
+        self.misses += 1
+        result = SOLVERS[algorithm](puzzle, **limits)
+        if result['status'] == STATUS_SOLVED:
+            self.put(key, format_puzzle_line(to_canonical(result['solution'], transform)))
+        elif result['status'] == STATUS_UNSOLVABLE:
+            self.put(key, CACHE_UNSOLVABLE)
+        result['time'] = time.perf_counter() - start_time
+        result['cache'] = 'miss'
+        return result
+
+    """ Счетчики кэша """
+    def info(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'used_bytes': self.used_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+""" Кэши процесса по параметрам (в процессах-обработчиках создаются при первой пачке) """
+_SOLUTION_CACHES = {}
+
+""" Общий для процесса кэш решений с заданными параметрами """
+def get_solution_cache(max_bytes: int = 64 << 20, path: Optional[str] = None) -> SolutionCache:
+    cache = _SOLUTION_CACHES.get((max_bytes, path))
+    if cache is None:
+        cache = _SOLUTION_CACHES[(max_bytes, path)] = SolutionCache(max_bytes, path)
+    return cache
+
+
+
+# Генерация головоломок
+""" Случайное заполненное поле: Dancing Links со случайным порядком строк на пустой доске """
+def generate_full_grid(side: int = 9, rng: Optional[random.Random] = None) -> List[List[int]]:
+    solver = DancingLinksSolver([[0] * side for _ in range(side)], rng=rng or random.Random())
+    solver.solve({'iterations': 0, 'backtracks': 0})
+    return solver.get_solution_board()
+
+""" Головоломка с единственным решением: из случайного поля в случайном порядке убираются подсказки,
+    пока решение остается единственным (count_solutions останавливается на втором решении).
+    clues и backtracks - допустимые диапазоны (от, до) числа подсказок и откатов Dancing Links;
+    удаление прекращается на нижней границе clues. Возвращает None, если за max_attempts полей
+    не удалось попасть в диапазоны """
+def generate_puzzle(side: int = 9, rng: Optional[random.Random] = None, clues: Optional[Tuple[int, int]] = None,
+                    backtracks: Optional[Tuple[int, int]] = None, max_attempts: int = 100) -> Optional[dict]:
+    rng = rng or random.Random()
+    cells = side * side
+    min_clues, max_clues = clues or (0, cells)
+    for attempt in range(1, max_attempts + 1):
+        solution = generate_full_grid(side, rng)
+        puzzle = [row[:] for row in solution]
+        remaining = cells
+        for index in rng.sample(range(cells), cells):
+            if remaining <= min_clues:
+                break
+            row, col = divmod(index, side)
+            puzzle[row][col] = 0
+            # Если цифра однозначно восстанавливается по строке, столбцу и блоку, множество решений не меняется
+            if len(get_candidates(puzzle, row, col)) == 1 or count_solutions(puzzle, 2) == 1:
+                remaining -= 1
+            else:
+                puzzle[row][col] = solution[row][col]
+        if remaining > max_clues:
+            continue
+        result = run_template_dancing_links_algorithm(puzzle)
+        if backtracks is not None and not backtracks[0] <= result['backtracks'] <= backtracks[1]:
+            continue
+        return {
+            'puzzle': puzzle,
+            'solution': solution,
+            'clues': remaining,
+            'iterations': result['iterations'],
+            'backtracks': result['backtracks'],
+            'attempts': attempt,
+        }
+    return None
+
+""" Генерация головоломок с номерами start..stop-1 в процессе-обработчике. При заданном seed у каждой
+    головоломки свой генератор случайных чисел, поэтому результат не зависит от числа процессов """
+def _generate_chunk(side: int, seed: Optional[int], start: int, stop: int, clues: Optional[Tuple[int, int]],
+                    backtracks: Optional[Tuple[int, int]], max_attempts: int) -> List[dict]:
+    records = []
+    for index in range(start, stop):
+        rng = random.Random(f"{seed}:{index}") if seed is not None else random.Random()
+        generated = generate_puzzle(side, rng, clues, backtracks, max_attempts)
+        if generated is None:
+            records.append({'index': index, 'error': f"нет головоломки в диапазоне за {max_attempts} попыток"})
+            continue
+        records.append({
+            'index': index,
+            'puzzle': format_puzzle_line(generated['puzzle']),
+            'solution': format_puzzle_line(generated['solution']),
+            'clues': generated['clues'],
+            'iterations': generated['iterations'],
+            'backtracks': generated['backtracks'],
+            'attempts': generated['attempts'],
+        })
+    return records
+
+""" Потоковая генерация count головоломок в пуле процессов (в порядке номеров при ordered=True) """
+def generate_puzzles(count: int, side: int = 9, seed: Optional[int] = None, workers: Optional[int] = None,
+                     clues: Optional[Tuple[int, int]] = None, backtracks: Optional[Tuple[int, int]] = None,
+                     chunk_size: int = 16, ordered: bool = True, max_attempts: int = 100) -> Iterator[dict]:
+    get_geometry(side)
+    tasks = ((side, seed, start, min(start + chunk_size, count), clues, backtracks, max_attempts)
+             for start in range(0, count, chunk_size))
+    yield from _run_chunk_tasks(_generate_chunk, tasks, workers, ordered)
+
+
+
+# Упакованный корпус
+""" Заголовок файла: сигнатура, версия, сторона поля, бит на клетку, число головоломок, размер записи,
+    смещение данных. Записи фиксированного размера, поэтому индекс - это формула offset + i * record_size """
+PACKED_MAGIC = b'SDKP'
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<4sBBBxQII')
+
+""" Бит на клетку: 4 для полей до 9x9 (значения 0..15), 8 для 16x16 и 25x25 """
+def packed_cell_bits(side: int) -> int:
+    return 4 if side < 16 else 8
+
+""" Размер записи одной головоломки в байтах """
+def packed_record_size(side: int) -> int:
+    return (side * side * packed_cell_bits(side) + 7) // 8
+
+""" Строка из side^2 символов в запись упакованного корпуса """
+def pack_puzzle_line(line: str) -> bytes:
+    board = parse_puzzle_line(line)
+    cells = [v for row in board for v in row]
+    if packed_cell_bits(len(board)) == 8:
+        return bytes(cells)
+    if len(cells) % 2:
+        cells.append(0)
+    return bytes((cells[i] << 4) | cells[i + 1] for i in range(0, len(cells), 2))
+
+""" Две клетки на байт: байт -> два символа строкового формата """
+_NIBBLE_PAIRS = [CELL_SYMBOLS[b >> 4] + CELL_SYMBOLS[b & 15] for b in range(256)]
+
+""" Запись упакованного корпуса в строку из side^2 символов """
+def unpack_puzzle_line(record, side: int) -> str:
+    if packed_cell_bits(side) == 8:
+        return ''.join(CELL_SYMBOLS[v] for v in record)
+    return ''.join([_NIBBLE_PAIRS[b] for b in record])[:side * side]
+
+""" Упаковка потока строк (пустые и '#' пропускаются) в файл, возвращает число головоломок.
+    Сторона поля определяется по первой строке, все остальные должны быть того же размера """
+def write_packed_corpus(lines: Iterable[str], path: str) -> int:
+    count = 0
+    side = None
+    with open(path, 'wb') as target:
+        target.write(b'\0' * PACKED_HEADER.size)
+        for chunk in _read_chunks(lines, 4096):
+            records = []
+            for index, line in chunk:
+                if side is None:
+                    side = math.isqrt(len(line))
+                elif len(line) != side * side:
+                    raise ValueError(f"головоломка {index}: длина {len(line)}, ожидалось {side * side}")
+                records.append(pack_puzzle_line(line))
+            target.write(b''.join(records))
+            count += len(records)
+        side = side or 9
+        target.seek(0)
+        target.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, side, packed_cell_bits(side), count,
+                                        packed_record_size(side), PACKED_HEADER.size))
+    return count
+
+""" Упакованный корпус, отображенный в память. Записи читаются без копирования, а страницы файла
+    общие для всех процессов, открывших его, поэтому корпус любого размера открывается мгновенно """
+class PackedCorpus:
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as source:
+            self.buffer = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buffer) < PACKED_HEADER.size:
+            self.buffer.close()
+            raise ValueError(f"{path}: не упакованный корпус судоку")
+        magic, version, side, bits, count, record_size, offset = PACKED_HEADER.unpack_from(self.buffer, 0)
+        if magic != PACKED_MAGIC or version != PACKED_VERSION:
+            self.buffer.close()
+            raise ValueError(f"{path}: не упакованный корпус судоку")
+        if bits != packed_cell_bits(side) or record_size != packed_record_size(side) \
+                or offset + count * record_size > len(self.buffer):
+            self.buffer.close()
+            raise ValueError(f"{path}: поврежденный заголовок")
+        self.side = side
+        self.count = count
+        self.record_size = record_size
+        self.offset = offset
+        self.view = memoryview(self.buffer)
+
+    def __len__(self) -> int:
+        return self.count
+
+    """ Байты записи без копирования """
+    def record(self, index: int) -> memoryview:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        start = self.offset + index * self.record_size
+        return self.view[start:start + self.record_size]
+
+    """ Головоломка в строковом формате """
+    def line(self, index: int) -> str:
+        return unpack_puzzle_line(self.record(index), self.side)
+
+    """ Головоломка в виде доски """
+    def __getitem__(self, index: int) -> List[List[int]]:
+        return parse_puzzle_line(self.line(index))
+
+    """ Строки головоломок с номерами start..stop-1 """
+    def iter_lines(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        stop = self.count if stop is None else min(stop, self.count)
+        for index in range(start, stop):
+            yield self.line(index)
+
+    def close(self):
+        self.view.release()
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+""" Корпуса, уже открытые в этом процессе-обработчике """
+_OPEN_CORPORA = {}
+
+""" Решение диапазона записей корпуса в процессе-обработчике: в задачу передаются только путь и границы """
+def _solve_packed_range(algorithm: str, path: str, start: int, stop: int, limits: Optional[dict] = None,
+                        cache: Optional[dict] = None) -> List[dict]:
+    corpus = _OPEN_CORPORA.get(path)
+    if corpus is None:
+        corpus = _OPEN_CORPORA[path] = PackedCorpus(path)
+    chunk = [(index, corpus.line(index)) for index in range(start, stop)]
+    return _solve_chunk(algorithm, chunk, limits, cache)
+
+""" Решение упакованного корпуса: как solve_many, но обработчики сами читают свои диапазоны из файла """
+def solve_packed(path: str, algorithm: str = 'dlx-template', workers: Optional[int] = None,
+                 chunk_size: int = 256, ordered: bool = True, time_limit: Optional[float] = None,
+                 max_iterations: Optional[int] = None, cache: Optional[dict] = None) -> Iterator[dict]:
+    if algorithm not in SOLVERS:
+        raise ValueError(f"неизвестный алгоритм {algorithm!r}")
+    limits = {'time_limit': time_limit, 'max_iterations': max_iterations}
+    with PackedCorpus(path) as corpus:
+        count = len(corpus)
+    tasks = ((algorithm, path, start, min(start + chunk_size, count), limits, cache)
+             for start in range(0, count, chunk_size))
+    yield from _run_chunk_tasks(_solve_packed_range, tasks, workers, ordered)
+
+""" Является ли файл упакованным корпусом (по сигнатуре) """
+def is_packed_corpus(path: str) -> bool:
+    try:
+        with open(path, 'rb') as source:
+            return source.read(len(PACKED_MAGIC)) == PACKED_MAGIC
+    except OSError:
+        return False
+
+
+
+# Асинхронный сервис решения
+""" Очередь сервиса заполнена: новый запрос отклонен (для HTTP - ответ 503) """
+class ServiceOverloaded(Exception):
+    pass
+
+""" Прогрев процесса-обработчика: готовые матрицы Dancing Links строятся до первого запроса """
+def _warm_service_worker(sides: Tuple[int, ...] = (9,)) -> int:
+    for side in sides:
+        get_template_solver(side)
+    return len(_TEMPLATE_SOLVERS)
+
+""" Решение одной головоломки в процессе-обработчике сервиса """
+def _service_solve(algorithm: str, puzzle: List[List[int]], time_limit: Optional[float]) -> dict:
+    return SOLVERS[algorithm](puzzle, time_limit=time_limit)
+
+""" Асинхронный сервис над прогретым пулом процессов. Одновременно вычисляется не больше max_in_flight
+    разных головоломок, сверх этого solve бросает ServiceOverloaded. Одинаковые головоломки, пришедшие
+    пока первая еще решается, ждут то же вычисление. deadline - секунды на запрос: ожидающий получает
+    'timed_out' по своему сроку. Вычисление ограничено сроком запроса, который его начал; если оно
+    прервалось по этому сроку, а у ожидающего время еще есть, головоломка отправляется заново """
+class SolveService:
+
+    def __init__(self, algorithm: str = 'dlx-template', workers: Optional[int] = None, max_in_flight: int = 64,
+                 default_deadline: Optional[float] = None, sides: Tuple[int, ...] = (9,)):
+        if algorithm not in SOLVERS:
+            raise ValueError(f"неизвестный алгоритм {algorithm!r}")
+        self.algorithm = algorithm
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_in_flight = max_in_flight
+        self.default_deadline = default_deadline
+        self.sides = sides
+        self.executor = None
+        self.in_flight = {}
+        self.counters = {'requests': 0, 'computed': 0, 'coalesced': 0, 'rejected': 0, 'timed_out': 0,
+                         'resubmitted': 0}
+
+    """ Запуск пула и прогрев всех процессов """
+    async def start(self):
+        if self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_service_worker,
+                                            initargs=(self.sides,))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.executor, _warm_service_worker, self.sides)
+                               for _ in range(self.workers)])
+
+    """ Остановка пула """
+    async def close(self):
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    """ Результат запроса, не уложившегося в срок (в формате решателей) """
+    def _timed_out_result(self, elapsed: float) -> dict:
+        return {
+            'algorithm': self.algorithm,
+            'solved': False,
+            'status': STATUS_TIMED_OUT,
+            'time': elapsed,
+            'iterations': 0,
+            'backtracks': 0,
+            'solution': None
+        }
+
+    """ Решение головоломки. Результат - словарь решателя SOLVERS[algorithm] """
+    async def solve(self, puzzle: List[List[int]], deadline: Optional[float] = None) -> dict:
+        if self.executor is None:
+            await self.start()
+        deadline = deadline if deadline is not None else self.default_deadline
+        start_time = time.perf_counter()
+        self.counters['requests'] += 1
+        key = format_puzzle_line(puzzle)
+        joined = False
+        while True:
+            remaining = None if deadline is None else deadline - (time.perf_counter() - start_time)
+            if remaining is not None and remaining <= 0:
+                self.counters['timed_out'] += 1
+                return self._timed_out_result(time.perf_counter() - start_time)
+            entry = self.in_flight.get(key)
+            if entry is not None:
+                if not joined:
+                    self.counters['coalesced'] += 1
+                    joined = True
+            else:
+                if len(self.in_flight) >= self.max_in_flight:
+                    self.counters['rejected'] += 1
+                    raise ServiceOverloaded(f"в работе уже {len(self.in_flight)} головоломок")
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self.executor, _service_solve, self.algorithm, puzzle, remaining)
+                entry = self.in_flight[key] = (future, remaining)
+                self.counters['computed'] += 1
+                future.add_done_callback(lambda done: self._forget(key, done))
+            future, limit = entry
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), remaining)
+            except asyncio.TimeoutError:
+                self.counters['timed_out'] += 1
+                return self._timed_out_result(time.perf_counter() - start_time)
+            if result['status'] != STATUS_TIMED_OUT or limit is None:
+                return dict(result)
+            # вычисление остановил срок другого запроса; у этого времени может быть больше
+            left = None if deadline is None else deadline - (time.perf_counter() - start_time)
+            if left is not None and left <= limit:
+                return dict(result)
+            self._forget(key, future)
+            self.counters['resubmitted'] += 1
+
+    """ Удаление завершенного вычисления из списка выполняемых """
+    def _forget(self, key: str, future):
+        entry = self.in_flight.get(key)
+        if entry is not None and entry[0] is future:
+            del self.in_flight[key]
+
+    """ Счетчики сервиса """
+    def info(self) -> dict:
+        return dict(self.counters, in_flight=len(self.in_flight), workers=self.workers, algorithm=self.algorithm)
+
+""" Причины для кодов ответа HTTP """
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+""" Ответ на запрос: POST /solve (тело - строка головоломки или JSON {"puzzle": ..., "deadline": ...}),
+    GET /stats. Возвращает (код, JSON-объект) """
+async def _service_http_response(service: SolveService, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+    if path == '/stats':
+        return (200, service.info()) if method == 'GET' else (405, {'error': 'нужен GET'})
+    if path != '/solve':
+        return 404, {'error': f"нет ресурса {path}"}
+    if method != 'POST':
+        return 405, {'error': 'нужен POST'}
+    text = body.decode('utf-8').strip()
+    deadline = None
+    try:
+        if text.startswith('{'):
+            request = json.loads(text)
+            text = request['puzzle']
+            deadline = request.get('deadline')
+            if not isinstance(text, str):
+                raise ValueError("puzzle должен быть строкой")
+            if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))
+                                         or not 0 < deadline < float('inf')):
+                raise ValueError("deadline должен быть положительным числом секунд")
+        puzzle = parse_puzzle_line(text)
+    except (ValueError, KeyError, TypeError) as error:
+        return 400, {'error': str(error)}
+    try:
+        result = await service.solve(puzzle, deadline)
+    except ServiceOverloaded as error:
+        return 503, {'error': str(error)}
+    return 200, _fill_record({'puzzle': text}, result)
+
+""" Обработка одного соединения HTTP/1.1 (один запрос на соединение) """
+async def _handle_http_connection(service: SolveService, reader: asyncio.StreamReader,
+                                  writer: asyncio.StreamWriter):
+    try:
+        request_line = (await reader.readline()).decode('latin-1')
+        method, path = request_line.split(' ')[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+        status, payload = await _service_http_response(service, method, path, body)
+    except (ValueError, asyncio.IncompleteReadError):
+        status, payload = 400, {'error': 'неверный запрос'}
+    except Exception as error:
+        # соединение не закрывается молча: клиент получает 500, причина - в stderr
+        print(f"Ошибка обработки запроса: {error!r}", file=sys.stderr)
+        status, payload = 500, {'error': 'внутренняя ошибка'}
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write((f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                  f"Content-Type: application/json; charset=utf-8\r\n"
+                  f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n").encode('latin-1') + data)
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+""" HTTP-сервер сервиса (работает до отмены) """
+async def serve_http(service: SolveService, host: str = '127.0.0.1', port: int = 8080):
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: _handle_http_connection(service, r, w), host, port)
+    print(f"Сервис слушает http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+""" Сервис на stdin/stdout: по головоломке в строке, ответы JSON Lines в порядке готовности.
+    Чтение ждет, пока в работе max_in_flight запросов, поэтому очередь не переполняется """
+async def serve_stdio(service: SolveService, source=None, target=None):
+    source = source or sys.stdin
+    target = target or sys.stdout
+    await service.start()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(service.max_in_flight)
+    tasks = set()
+
+    async def answer(index: int, line: str):
+        try:
+            try:
+                record = _fill_record({'index': index, 'puzzle': line}, await service.solve(parse_puzzle_line(line)))
+            except ValueError as error:
+                record = {'index': index, 'puzzle': line, 'solved': False, 'error': str(error)}
+            target.write(json.dumps(record, ensure_ascii=False) + '\n')
+            target.flush()
+        finally:
+            slots.release()
+
+    index = 0
+    while True:
+        line = await loop.run_in_executor(None, source.readline)
+        if not line:
+            break
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        await slots.acquire()
+        task = asyncio.create_task(answer(index, line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        index += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+
+# Масштабирование по размеру поля
+""" Случайное заполненное поле: базовый шаблон, перестановки полос, строк внутри полос, столбцов и цифр """
+def random_full_grid(side: int, rng: random.Random) -> List[List[int]]:
+    box = get_geometry(side).box
+
+    def shuffled_lines() -> List[int]:
+        return [band * box + line for band in rng.sample(range(box), box) for line in rng.sample(range(box), box)]
+
+    rows, cols = shuffled_lines(), shuffled_lines()
+    digits = rng.sample(range(1, side + 1), side)
+    return [[digits[(box * (r % box) + r // box + c) % side] for c in cols] for r in rows]
+
+""" Головоломка из случайного поля с долей подсказок clue_ratio (единственность решения не проверяется) """
+def random_puzzle(side: int, clue_ratio: float, rng: random.Random) -> List[List[int]]:
+    grid = random_full_grid(side, rng)
+    cells = side * side
+    for index in rng.sample(range(cells), cells - round(clue_ratio * cells)):
+        grid[index // side][index % side] = 0
+    return grid
+
+""" Наибольшая сторона поля для наивного перебора (дальше время растет экспоненциально) """
+NAIVE_MAX_SIDE = 9
+
+""" Время и число узлов каждого алгоритма на полях разных размеров """
+def benchmark_grid_sizes(boxes: Iterable[int] = (2, 3, 4, 5), puzzles_per_size: int = 3, clue_ratio: float = 0.55,
+                         seed: int = 1, algorithms: Optional[List[str]] = None) -> List[dict]:
+    algorithms = algorithms or ['naive', 'constrained', 'propagation', 'dlx']
+    rng = random.Random(seed)
+    results = []
+    for box in boxes:
+        side = box * box
+        puzzles = [random_puzzle(side, clue_ratio, rng) for _ in range(puzzles_per_size)]
+        for name in algorithms:
+            if name == 'naive' and side > NAIVE_MAX_SIDE:
+                continue
+            times = []
+            iterations = 0
+            solved = 0
+            for puzzle in puzzles:
+                result = SOLVERS[name](puzzle)
+                times.append(result['time'])
+                iterations += result['iterations']
+                solved += result['solved']
+            times.sort()
+            results.append({
+                'side': side,
+                'algorithm': name,
+                'solved': solved,
+                'puzzles': len(puzzles),
+                'median_ms': times[len(times) // 2] * 1000,
+                'iterations': iterations / len(puzzles),
+            })
+    return results
+
+""" Вывод таблицы масштабирования """
+def print_grid_scaling(results: List[dict]):
+    print(f"{'Поле':>7} {'Алгоритм':<14} {'Решено':>7} {'Медиана, мс':>12} {'Узлов':>10}")
+    for row in results:
+        size = f"{row['side']}x{row['side']}"
+        print(f"{size:>7} {row['algorithm']:<14} {row['solved']:>3}/{row['puzzles']:<3} "
+              f"{row['median_ms']:>12.2f} {row['iterations']:>10.0f}")
+
+
+
+# Набор тестов производительности
+""" Встроенный корпус головоломок по уровням (уровень определен по числу узлов наивного и ограниченного перебора) """
+SUDOKU_CORPUS = {
+    'easy': [
+        "003020600900305001001806400008102900700000008006708200002609500800203009005010300",
+        "200080300060070084030500209000105408000000000402706000301007040720040060004010003",
+        "030050040008010500460000012070502080000603000040109030250000098001020600080060020",
+        "020810740700003100090002805009040087400208003160030200302700060005600008076051090",
+        "480006902002008001900370060840010200003704100001060049020085007700900600609200018",
+    ],
+    'medium': [
+        "000000907000420180000705026100904000050000040000507009920108000034059000507000000",
+        "100920000524010000000000070050008102000000000402700090060000000000030945000071006",
+        "043080250600000000000001094900004070000608000010200003820500000000000005034090710",
+        "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+        "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    ],
+    'hard': [
+        "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+        "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+        "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+        "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+        "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+        ".2.4.37.........32........4.4.2...7.8...5.........1...5.....9...3.9....7..1..86..",
+    ],
+    'adversarial': [
+        # пустая первая строка и подсказки в конце - против перебора слева направо
+        "..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9",
+        "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+    ],
+}
+
+""" Алгоритмы, участвующие в замерах """
+BENCHMARK_SOLVERS = ['naive', 'naive-fast', 'constrained', 'propagation', 'dlx', 'dlx-template', 'bitboard']
+
+""" Сочетания, которые не запускаются: наивный перебор на них работает минуты """
+BENCHMARK_SKIP = {('naive', 'hard'), ('naive', 'adversarial'),
+                  ('naive-fast', 'hard'), ('naive-fast', 'adversarial')}
+
+""" Перцентиль по отсортированному списку (метод ближайшего ранга) """
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+""" Пиковая память одного решения (tracemalloc), КБ """
+def _peak_memory_kb(solver: str, puzzle: List[List[int]]) -> float:
+    tracemalloc.start()
+    try:
+        SOLVERS[solver](puzzle)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+""" Замеры: каждый алгоритм на каждом уровне корпуса, warmup прогонов без учета и repeats учитываемых """
+def benchmark_solvers(levels: Optional[List[str]] = None, solvers: Optional[List[str]] = None, repeats: int = 5,
+                      warmup: int = 1, measure_memory: bool = True) -> List[dict]:
+    levels = levels or list(SUDOKU_CORPUS)
+    solvers = solvers or BENCHMARK_SOLVERS
+    results = []
+    for solver in solvers:
+        for level in levels:
+            if (solver, level) in BENCHMARK_SKIP:
+                continue
+            puzzles = [parse_puzzle_line(line) for line in SUDOKU_CORPUS[level]]
+            for _ in range(warmup):
+                for puzzle in puzzles:
+                    SOLVERS[solver](puzzle)
+            latencies = []
+            iterations = 0
+            backtracks = 0
+            solved = 0
+            for _ in range(repeats):
+                for puzzle in puzzles:
+                    result = SOLVERS[solver](puzzle)
+                    latencies.append(result['time'])
+                    iterations += result['iterations']
+                    backtracks += result['backtracks']
+                    solved += result['solved']
+            latencies.sort()
+            runs = len(latencies)
+            results.append({
+                'solver': solver,
+                'level': level,
+                'puzzles': len(puzzles),
+                'runs': runs,
+                'solved': solved,
+                'median_ms': _percentile(latencies, 50) * 1000,
+                'p95_ms': _percentile(latencies, 95) * 1000,
+                'p99_ms': _percentile(latencies, 99) * 1000,
+                'mean_iterations': iterations / runs,
+                'mean_backtracks': backtracks / runs,
+                'peak_memory_kb': max(_peak_memory_kb(solver, p) for p in puzzles) if measure_memory else None,
+            })
+    return results
+
+""" Описание окружения для сравнения запусков между коммитами """
+def benchmark_metadata() -> dict:
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'cpu_count': multiprocessing.cpu_count(),
+    }
+
+""" Результаты замеров в JSON """
+def write_benchmark_json(results: List[dict], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'metadata': benchmark_metadata(), 'results': results}, f, ensure_ascii=False, indent=2)
+
+""" Результаты замеров в CSV (по строке на пару алгоритм/уровень) """
+def write_benchmark_csv(results: List[dict], path: str):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]) if results else ['solver', 'level'])
+        writer.writeheader()
+        writer.writerows(results)
+
+""" Вывод таблицы замеров """
+def print_benchmark(results: List[dict]):
+    print(f"{'Алгоритм':<13} {'Уровень':<12} {'Решено':>8} {'Медиана':>9} {'p95':>9} {'p99':>9} "
+          f"{'Узлов':>9} {'Откатов':>9} {'Память, КБ':>11}")
+    for row in results:
+        memory = f"{row['peak_memory_kb']:.0f}" if row['peak_memory_kb'] is not None else '-'
+        print(f"{row['solver']:<13} {row['level']:<12} {row['solved']:>4}/{row['runs']:<3} "
+              f"{row['median_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} "
+              f"{row['mean_iterations']:>9.0f} {row['mean_backtracks']:>9.0f} {memory:>11}")
+
+
+
+# Адаптивный выбор решателя
+""" Решатели, между которыми выбирает диспетчер """
+DISPATCH_SOLVERS = ['constrained', 'propagation', 'dlx-template', 'bitboard']
+
+""" Правила по умолчанию (calibrate_dispatch_rules на встроенном корпусе и сгенерированных головоломках).
+    Правило действует, пока число незаполненных после распространения клеток не больше max_remaining.
+    ranking - решатели от быстрого к медленному, regret - во сколько раз в среднем выбранный решатель
+    медленнее лучшего для каждой головоломки группы, node_budget - предел узлов для выбранного решателя,
+    после которого головоломка уходит в портфель """
+DEFAULT_DISPATCH_RULES = [
+    {'max_remaining': 41, 'ranking': ['propagation', 'bitboard'], 'regret': 1.11, 'samples': 7, 'node_budget': 92},
+    {'max_remaining': 45, 'ranking': ['propagation', 'bitboard'], 'regret': 1.02, 'samples': 6, 'node_budget': 92},
+    {'max_remaining': None, 'ranking': ['propagation', 'bitboard'], 'regret': 1.49, 'samples': 7,
+     'node_budget': 364},
+]
+
+""" Дешевые признаки головоломки: подсказки, кандидаты до и после распространения на битовых досках.
+    Возвращает (признаки, Bitboard после распространения или None при противоречии) """
+def dispatch_features(puzzle: List[List[int]]) -> Tuple[dict, Optional[Bitboard]]:
+    state = Bitboard(puzzle)
+    features = {'clues': sum(1 for row in puzzle for v in row if v)}
+    if not state.valid:
+        features.update({'candidates': 0, 'remaining': 0, 'remaining_candidates': 0, 'contradiction': True})
+        return features, None
+    features['candidates'] = sum(c.bit_count() for c in state.cands)
+    consistent = state.propagate()
+    features['remaining'] = state.unsolved.bit_count()
+    features['remaining_candidates'] = sum(c.bit_count() for c in state.cands)
+    features['contradiction'] = not consistent
+    return features, state if consistent else None
+
+""" Калибровка правил по замерам. Головоломки, которые не решаются распространением (их диспетчер
+    решает сам), делятся на bins групп по числу клеток, оставшихся после распространения; в каждой
+    группе решатели ранжируются по среднему времени (время сверх time_limit считается как time_limit).
+    По умолчанию - встроенный корпус и generated сгенерированных головоломок """
+def calibrate_dispatch_rules(puzzles: Optional[List[List[List[int]]]] = None, solvers: Optional[List[str]] = None,
+                             bins: int = 3, repeats: int = 3, time_limit: float = 2.0, generated: int = 30,
+                             seed: int = 1) -> List[dict]:
+    if puzzles is None:
+        puzzles = [parse_puzzle_line(line) for level in SUDOKU_CORPUS.values() for line in level]
+        puzzles += [generate_puzzle(9, random.Random(f"dispatch:{seed}:{i}"))['puzzle'] for i in range(generated)]
+    solvers = solvers or DISPATCH_SOLVERS
+    samples = []
+    for puzzle in puzzles:
+        features, state = dispatch_features(puzzle)
+        if state is None or not state.unsolved:
+            continue
+        times = {}
+        nodes = {}
+        for solver in solvers:
+            runs = []
+            for _ in range(repeats):
+                result = SOLVERS[solver](puzzle, time_limit=time_limit)
+                runs.append(result['time'] if result['status'] != STATUS_TIMED_OUT else time_limit)
+            times[solver] = sorted(runs)[len(runs) // 2]
+            nodes[solver] = result['iterations']
+        samples.append((features['remaining'], times, nodes))
+    samples.sort(key=lambda sample: sample[0])
+    # Границы групп по квантилям, головоломки с одинаковым признаком остаются в одной группе
+    groups = []
+    start = 0
+    for i in range(1, max(1, bins) + 1):
+        stop = max(start, i * len(samples) // max(1, bins))
+        while 0 < stop < len(samples) and samples[stop][0] == samples[stop - 1][0]:
+            stop += 1
+        if stop > start:
+            groups.append(samples[start:stop])
+            start = stop
+    rules = []
+    for index, group in enumerate(groups):
+        mean_times = {solver: sum(sample[1][solver] for sample in group) / len(group) for solver in solvers}
+        ranking = sorted(solvers, key=mean_times.get)
+        best = ranking[0]
+        regret = sum(sample[1][best] / max(min(sample[1].values()), 1e-9) for sample in group) / len(group)
+        rules.append({
+            'max_remaining': group[-1][0] if index < len(groups) - 1 else None,
+            'ranking': ranking[:2],
+            'regret': regret,
+            'samples': len(group),
+            'node_budget': 4 * max(sample[2][best] for sample in group) + CHECK_INTERVAL,
+        })
+    return rules
+
+""" Диспетчер: по признакам выбирает решатель из правил. Если прогноз неуверенный (мало замеров
+    или средняя потеря лидера группы больше max_regret) либо выбранный решатель превысил бюджет узлов
+    правила, головоломка решается портфелем из решателей ranking """
+class SolverDispatcher:
+
+    def __init__(self, rules: Optional[List[dict]] = None, max_regret: float = 1.5, min_samples: int = 3):
+        self.rules = rules or DEFAULT_DISPATCH_RULES
+        self.max_regret = max_regret
+        self.min_samples = min_samples
+        self.counters = {'propagation': 0, 'predicted': 0, 'uncertain': 0, 'escalated': 0}
+
+    """ Правило для признаков """
+    def rule_for(self, features: dict) -> dict:
+        for rule in self.rules:
+            if rule['max_remaining'] is None or features['remaining'] <= rule['max_remaining']:
+                return rule
+        return self.rules[-1]
+
+    """ Прогноз: (решатель, уверен ли прогноз, правило) """
+    def predict(self, features: dict) -> Tuple[str, bool, dict]:
+        rule = self.rule_for(features)
+        confident = rule['samples'] >= self.min_samples and rule['regret'] <= self.max_regret
+        return rule['ranking'][0], confident, rule
+
+    """ Портфель из решателей правила """
+    def _portfolio(self, puzzle: List[List[int]], rule: dict, time_limit: Optional[float],
+                   max_iterations: Optional[int]) -> dict:
+        return parallel_solve_algorithms(puzzle, [SOLVERS[name] for name in rule['ranking']], time_limit,
+                                         max_iterations)
+
+    """ Решение с выбором решателя. Результат - словарь решателя с полем 'dispatch' """
+    def solve(self, puzzle: List[List[int]], time_limit: Optional[float] = None,
+              max_iterations: Optional[int] = None) -> dict:
+        start_time = time.perf_counter()
+        features, state = dispatch_features(puzzle)
+        dispatch = {'features': features, 'solver': None, 'confident': True, 'escalated': False}
+        if state is None or not state.unsolved:
+            # Ответ получен уже при вычислении признаков
+            self.counters['propagation'] += 1
+            solved = state is not None
+            return {
+                'algorithm': 'Адаптивный (распространение)',
+                'solved': solved,
+                'status': STATUS_SOLVED if solved else STATUS_UNSOLVABLE,
+                'time': time.perf_counter() - start_time,
+                'iterations': 1,
+                'backtracks': 0,
+                'solution': state.to_board() if solved else None,
+                'dispatch': dispatch
+            }
+        solver, confident, rule = self.predict(features)
+        dispatch.update({'solver': solver, 'confident': confident})
+        if not confident:
+            self.counters['uncertain'] += 1
+            result = self._portfolio(puzzle, rule, time_limit, max_iterations)
+        else:
+            self.counters['predicted'] += 1
+            budget = rule['node_budget'] if max_iterations is None else min(rule['node_budget'], max_iterations)
+            result = SOLVERS[solver](puzzle, time_limit=time_limit, max_iterations=budget)
+            if result['status'] == STATUS_TIMED_OUT and budget < (max_iterations or float('inf')):
+                self.counters['escalated'] += 1
+                dispatch['escalated'] = True
+                remaining_time = None if time_limit is None else max(0.0, time_limit - (time.perf_counter() - start_time))
+                spent = result['iterations']
+                result = self._portfolio(puzzle, rule, remaining_time, max_iterations)
+                result['iterations'] += spent
+        result['time'] = time.perf_counter() - start_time
+        result['algorithm'] = f"Адаптивный ({result['algorithm']})"
+        result['dispatch'] = dispatch
+        return result
+
+""" Диспетчер с правилами по умолчанию (по одному на процесс) """
+_DEFAULT_DISPATCHER = None
+
+""" Запуск адаптивного выбора решателя """
+def run_adaptive_algorithm(puzzle: Optional[List[List[int]]] = None, control: Optional[SolveControl] = None,
+                           time_limit: Optional[float] = None, max_iterations: Optional[int] = None,
+                           progress=None) -> dict:
+    global _DEFAULT_DISPATCHER
+    if _DEFAULT_DISPATCHER is None:
+        _DEFAULT_DISPATCHER = SolverDispatcher()
+    return _DEFAULT_DISPATCHER.solve([row[:] for row in (puzzle or ORIGINAL_PUZZLE)], time_limit, max_iterations)
+
+SOLVERS['auto'] = run_adaptive_algorithm
+
+""" Правила диспетчера в JSON """
+def write_dispatch_rules(rules: List[dict], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'metadata': benchmark_metadata(), 'rules': rules}, f, ensure_ascii=False, indent=2)
+
+""" Правила диспетчера из JSON (записанного write_dispatch_rules) """
+def read_dispatch_rules(path: str) -> List[dict]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['rules']
+
+
+
 # Проверка
 """ Вывод решения судоку """
 def print_sudoku(board: List[List[int]]):
-    print("\n" + "="*25)  
-    for i in range(9):  
-        if i % 3 == 0 and i != 0:  
-            print("-" * 25)  
+    side = len(board)
+    box = get_geometry(side).box
+    width = 2 * side + 2 * (box - 1) + 3
+    print("\n" + "="*width)  
+    for i in range(side):  
+        if i % box == 0 and i != 0:  
+            print("-" * width)  
         row_str = ""  
-        for j in range(9):  
-            if j % 3 == 0 and j != 0:  
+        for j in range(side):  
+            if j % box == 0 and j != 0:  
                 row_str += "| "  
-            val = board[i][j] if board[i][j] != 0 else "."  
+            val = CELL_SYMBOLS[board[i][j]] if board[i][j] != 0 else "."  
             row_str += f"{val} "  
         print(row_str)  
-    print("="*25)  
+    print("="*width)  
 
 """ Запуск алгоритмов и вывод результатов """
 def test_all_algorithms():
@@ -400,22 +4104,222 @@ def test_all_algorithms():
     print("="*60)  
     results = [
         run_naive_algorithm(),  
+        run_naive_fast_algorithm(),
         run_constrained_algorithm(),  
+        run_propagation_algorithm(),
         run_dancing_links_algorithm(),  
+        run_bitboard_algorithm(),
         parallel_solve_algorithms(),  
     ]
     for result in results:
         print(f"\n{'─'*60}")  
         print(f"Алгоритм: {result['algorithm']}")  
         print(f"{'─'*60}")  
-        print(f"Решено: {'Да' if result['solved'] else 'Нет'}")  
+        print(f"Решено: {'Да' if result['solved'] else 'Нет'} ({result['status']})")  
         print(f"Время: {result['time']*1000:.2f} мс")  
         print(f"Итераций: {result['iterations']:,}".replace(",", " "))  
         print(f"Откатов: {result['backtracks']:,}".replace(",", " "))  
+        if 'propagation' in result:
+            report = result['propagation']
+            print(f"Одиночки: {report['naked_singles']}, скрытые одиночки: {report['hidden_singles']}, "
+                  f"исключено запертых кандидатов: {report['locked_candidates']}")
         if result['solved']:  
             print("Решение найдено")  
             print_sudoku(result['solution'])  
     
 
+""" Разбор аргументов командной строки """
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Решение судоку разными алгоритмами")
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('demo', help="сравнение алгоритмов на встроенной головоломке")
+    solve_parser = commands.add_parser('solve', help="потоковое решение файла (по головоломке в строке)")
+    solve_parser.add_argument('input', nargs='?', default='-',
+                              help="файл с головоломками (строки или упакованный корпус), '-' - stdin")
+    solve_parser.add_argument('-o', '--output', default='-', help="файл для результатов, '-' - stdout")
+    solve_parser.add_argument('-a', '--algorithm', default='dlx-template', choices=sorted(SOLVERS))
+    solve_parser.add_argument('-w', '--workers', type=int, default=None, help="число процессов")
+    solve_parser.add_argument('--chunk-size', type=int, default=256)
+    solve_parser.add_argument('--unordered', action='store_true', help="выводить в порядке готовности")
+    solve_parser.add_argument('--jsonl', action='store_true', help="вывод в формате JSON Lines")
+    solve_parser.add_argument('--time-limit', type=float, default=None, help="лимит времени на головоломку, с")
+    solve_parser.add_argument('--max-iterations', type=int, default=None, help="лимит узлов на головоломку")
+    solve_parser.add_argument('--cache-mb', type=float, default=None, help="кэш решений в памяти процесса, МБ")
+    solve_parser.add_argument('--cache-db', default=None, help="файл sqlite для общего кэша решений")
+    pack_parser = commands.add_parser('pack', help="упаковка строкового файла в двоичный корпус")
+    pack_parser.add_argument('input', help="файл с головоломками, '-' - stdin")
+    pack_parser.add_argument('output', help="файл упакованного корпуса")
+    unpack_parser = commands.add_parser('unpack', help="распаковка двоичного корпуса в строки")
+    unpack_parser.add_argument('input', help="файл упакованного корпуса")
+    unpack_parser.add_argument('-o', '--output', default='-', help="файл для строк, '-' - stdout")
+    generate_parser = commands.add_parser('generate', help="генерация головоломок с единственным решением")
+    generate_parser.add_argument('count', type=int, help="число головоломок")
+    generate_parser.add_argument('-o', '--output', default='-', help="файл для головоломок, '-' - stdout")
+    generate_parser.add_argument('--side', type=int, default=9, help="сторона поля")
+    generate_parser.add_argument('--seed', type=int, default=None)
+    generate_parser.add_argument('-w', '--workers', type=int, default=None, help="число процессов")
+    generate_parser.add_argument('--chunk-size', type=int, default=16)
+    generate_parser.add_argument('--clues', type=int, nargs=2, metavar=('MIN', 'MAX'), default=None,
+                                 help="диапазон числа подсказок")
+    generate_parser.add_argument('--backtracks', type=int, nargs=2, metavar=('MIN', 'MAX'), default=None,
+                                 help="диапазон числа откатов Dancing Links")
+    generate_parser.add_argument('--jsonl', action='store_true', help="вывод в формате JSON Lines")
+    generate_parser.add_argument('--packed', action='store_true', help="запись в упакованный корпус (нужен -o)")
+    serve_parser = commands.add_parser('serve', help="асинхронный сервис решения (HTTP или stdin/stdout)")
+    serve_parser.add_argument('--http', metavar='HOST:PORT', default=None, help="адрес HTTP, иначе stdin/stdout")
+    serve_parser.add_argument('-a', '--algorithm', default='dlx-template', choices=sorted(SOLVERS))
+    serve_parser.add_argument('-w', '--workers', type=int, default=None, help="число процессов")
+    serve_parser.add_argument('--max-in-flight', type=int, default=64, help="предел одновременных вычислений")
+    serve_parser.add_argument('--deadline', type=float, default=None, help="срок на запрос по умолчанию, с")
+    columns_parser = commands.add_parser('columns', help="сравнение стратегий выбора столбца Dancing Links")
+    columns_parser.add_argument('--levels', nargs='+', choices=list(SUDOKU_CORPUS), default=None)
+    columns_parser.add_argument('--strategies', nargs='+', choices=list(COLUMN_STRATEGIES), default=None)
+    columns_parser.add_argument('--repeats', type=int, default=3)
+    columns_parser.add_argument('--seed', type=int, default=1)
+    calibrate_parser = commands.add_parser('calibrate', help="калибровка правил адаптивного выбора решателя")
+    calibrate_parser.add_argument('-o', '--output', default=None, help="файл для правил в JSON")
+    calibrate_parser.add_argument('--bins', type=int, default=3)
+    calibrate_parser.add_argument('--repeats', type=int, default=3)
+    calibrate_parser.add_argument('--generated', type=int, default=30, help="сгенерированных головоломок")
+    calibrate_parser.add_argument('--seed', type=int, default=1)
+    scaling_parser = commands.add_parser('scaling', help="время алгоритмов на полях 4x4 ... 25x25")
+    scaling_parser.add_argument('--boxes', type=int, nargs='+', default=[2, 3, 4, 5], help="стороны блоков")
+    scaling_parser.add_argument('--puzzles', type=int, default=3, help="головоломок на размер")
+    scaling_parser.add_argument('--clues', type=float, default=0.55, help="доля подсказок")
+    scaling_parser.add_argument('--seed', type=int, default=1)
+    bench_parser = commands.add_parser('bench', help="замеры алгоритмов на встроенном корпусе")
+    bench_parser.add_argument('--levels', nargs='+', choices=list(SUDOKU_CORPUS), default=None)
+    bench_parser.add_argument('--solvers', nargs='+', choices=sorted(SOLVERS), default=None)
+    bench_parser.add_argument('--repeats', type=int, default=5)
+    bench_parser.add_argument('--warmup', type=int, default=1)
+    bench_parser.add_argument('--no-memory', action='store_true', help="не замерять память")
+    bench_parser.add_argument('--json', help="файл для результатов в JSON")
+    bench_parser.add_argument('--csv', help="файл для результатов в CSV")
+    return parser
+
+""" Команда solve """
+def _run_solve_command(args: argparse.Namespace):
+    packed = args.input != '-' and is_packed_corpus(args.input)
+    cache = None
+    if args.cache_mb is not None or args.cache_db is not None:
+        cache = {'max_bytes': int((args.cache_mb if args.cache_mb is not None else 64) * (1 << 20)),
+                 'path': args.cache_db}
+    source = sys.stdin if args.input == '-' or packed else open(args.input, encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        if packed:
+            records = solve_packed(args.input, args.algorithm, args.workers, args.chunk_size, not args.unordered,
+                                   args.time_limit, args.max_iterations, cache)
+        else:
+            records = solve_many(source, args.algorithm, args.workers, args.chunk_size, not args.unordered,
+                                 args.time_limit, args.max_iterations, cache)
+        for record in records:
+            target.write((json.dumps(record, ensure_ascii=False) if args.jsonl else format_result_line(record)) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+""" Команды pack и unpack """
+def _run_pack_command(args: argparse.Namespace):
+    if args.command == 'pack':
+        source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+        try:
+            count = write_packed_corpus(source, args.output)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        print(f"Упаковано головоломок: {count}", file=sys.stderr)
+        return
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        with PackedCorpus(args.input) as corpus:
+            for line in corpus.iter_lines():
+                target.write(line + '\n')
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+""" Команда generate """
+def _run_generate_command(args: argparse.Namespace):
+    records = generate_puzzles(args.count, args.side, args.seed, args.workers, args.clues, args.backtracks,
+                               args.chunk_size)
+    failures = 0
+
+    def generated_lines() -> Iterator[str]:
+        nonlocal failures
+        for record in records:
+            if 'error' in record:
+                failures += 1
+                continue
+            yield record['puzzle']
+
+    if args.packed:
+        if args.output == '-':
+            raise SystemExit("для --packed нужен файл -o")
+        count = write_packed_corpus(generated_lines(), args.output)
+        print(f"Упаковано головоломок: {count}", file=sys.stderr)
+    else:
+        target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        try:
+            if args.jsonl:
+                for record in records:
+                    target.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                for line in generated_lines():
+                    target.write(line + '\n')
+        finally:
+            if target is not sys.stdout:
+                target.close()
+    if failures:
+        print(f"Не сгенерировано головоломок: {failures}", file=sys.stderr)
+
+""" Команда serve """
+def _run_serve_command(args: argparse.Namespace):
+    async def run():
+        async with SolveService(args.algorithm, args.workers, args.max_in_flight, args.deadline) as service:
+            if args.http:
+                host, _, port = args.http.rpartition(':')
+                await serve_http(service, host or '127.0.0.1', int(port))
+            else:
+                await serve_stdio(service)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+""" Точка входа """
+def main(argv: Optional[List[str]] = None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command == 'solve':
+        _run_solve_command(args)
+    elif args.command in ('pack', 'unpack'):
+        _run_pack_command(args)
+    elif args.command == 'generate':
+        _run_generate_command(args)
+    elif args.command == 'serve':
+        _run_serve_command(args)
+    elif args.command == 'bench':
+        results = benchmark_solvers(args.levels, args.solvers, args.repeats, args.warmup, not args.no_memory)
+        print_benchmark(results)
+        if args.json:
+            write_benchmark_json(results, args.json)
+        if args.csv:
+            write_benchmark_csv(results, args.csv)
+    elif args.command == 'calibrate':
+        rules = calibrate_dispatch_rules(bins=args.bins, repeats=args.repeats, generated=args.generated, seed=args.seed)
+        print(json.dumps(rules, ensure_ascii=False, indent=2))
+        if args.output:
+            write_dispatch_rules(rules, args.output)
+    elif args.command == 'columns':
+        print_column_strategies(benchmark_column_strategies(args.levels, args.strategies, args.repeats, args.seed))
+    elif args.command == 'scaling':
+        print_grid_scaling(benchmark_grid_sizes(args.boxes, args.puzzles, args.clues, args.seed))
+    else:
+        test_all_algorithms()
+
+
 if __name__ == "__main__":
-    test_all_algorithms()  
\ No newline at end of file
+    main()
\ No newline at end of file